@@ -1,7 +1,7 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
-from conexion import load_data, MAIN_WORKSHEET_NAME, COL_PUNTAJE
+from conexion import COL_PUNTAJE
+from vistas import evaluaciones_actuales
 
 # 1. Configuración de página (Debe ser lo primero)
 st.set_page_config(
@@ -11,8 +11,8 @@ st.set_page_config(
     initial_sidebar_state="collapsed",
 )
 
-# 2. Carga de datos centralizada
-df = load_data(MAIN_WORKSHEET_NAME)
+# 2. Carga de datos centralizada (última evaluación de cada cliente)
+df = evaluaciones_actuales()
 
 # --- Encabezado Principal ---
 col_text, col_img = st.columns([3, 1])
@@ -34,9 +34,8 @@ st.divider()
 
 # 3. Resumen Ejecutivo (KPIs)
 if not df.empty:
-    # Procesamiento rápido de datos para el Inicio
+    # El puntaje ya viene numérico desde load_data (esquema de la hoja)
     target_col = COL_PUNTAJE.upper()
-    df[target_col] = pd.to_numeric(df[target_col], errors='coerce').fillna(0)
 
     # Métricas clave
     total_clientes = len(df)
@@ -69,6 +68,7 @@ if not df.empty:
     * **Reporte Cliente:** Genera un análisis visual detallado (Gráfico Radar) para un cliente específico.
     * **Proyectos Agronomy Analyzer:** Seguimiento de implementaciones y proyectos Analyzer.
     * **Ventas:** Gestión de oportunidades comerciales detectadas.
+    * **Tendencias:** Evolución mensual de puntajes, certificación por trimestre y tiempo hasta certificar.
     """)
 
 else:
@@ -0,0 +1,119 @@
+import os
+import json
+import sqlite3
+import threading
+from gspread.utils import a1_range_to_grid_range, absolute_range_name, rowcol_to_a1
+from replica import texto_celda
+
+# --- ALMACENAMIENTO DE LAS HOJAS ---
+# Todo lo que la app lee o escribe pasa por un almacenamiento con tres operaciones: leer rangos,
+# agregar filas al final y actualizar celdas. conexion.py elige la implementación según
+# SMARTFARM_BACKEND: Google Sheets (por defecto) o una base SQLite local (modo sin conexión).
+#
+# Los rangos son (hoja, rango A1 dentro de la hoja o None para la hoja completa) y los valores
+# se leen como texto, igual que los devuelve la API de Sheets.
+
+
+class AlmacenGoogleSheets:
+    """Planilla de Google Sheets; `planilla` es una función que devuelve el Spreadsheet abierto."""
+
+    def __init__(self, planilla):
+        self._planilla = planilla
+
+    def leer(self, rangos):
+        """Valores de cada rango (lista de filas por rango) en un solo values_batch_get."""
+        respuesta = self._planilla().values_batch_get(
+            [absolute_range_name(hoja, rango) if rango else absolute_range_name(hoja) for hoja, rango in rangos])
+        return [r.get("values", []) for r in respuesta.get("valueRanges", [])]
+
+    def agregar(self, hoja, filas, value_input_option="RAW"):
+        """Agrega las filas al final de la hoja. Devuelve el número de la primera fila escrita (o None)."""
+        respuesta = self._planilla().values_append(absolute_range_name(hoja), {"valueInputOption": value_input_option},
+                                                   {"values": filas})
+        rango = respuesta.get("updates", {}).get("updatedRange", "")
+        if "!" not in rango:
+            return None
+        return a1_range_to_grid_range(rango.split("!")[-1]).get("startRowIndex", -1) + 1 or None
+
+    def actualizar(self, cambios):
+        """Escribe los cambios [(hoja, fila, columna, valor)] en un solo values_batch_update (USER_ENTERED)."""
+        data = [{"range": absolute_range_name(hoja, rowcol_to_a1(fila, col)), "values": [[valor]]}
+                for hoja, fila, col, valor in cambios]
+        return self._planilla().values_batch_update(body={"valueInputOption": "USER_ENTERED", "data": data})
+
+
+class AlmacenLocal:
+    """Hojas guardadas en una base SQLite local (una fila de la hoja por registro, en JSON).
+
+    Sirve para trabajar sin conexión y para pruebas: las hojas que no existen se crean con los
+    `encabezados` indicados.
+    """
+
+    def __init__(self, path, encabezados=None):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._con = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.execute("""
+            CREATE TABLE IF NOT EXISTS celdas (
+                hoja TEXT NOT NULL,
+                fila INTEGER NOT NULL,
+                valores TEXT NOT NULL,
+                PRIMARY KEY (hoja, fila)
+            ) WITHOUT ROWID
+        """)
+        for hoja, titulos in (encabezados or {}).items():
+            self._con.execute("INSERT OR IGNORE INTO celdas (hoja, fila, valores) VALUES (?, 1, ?)",
+                              (hoja, json.dumps(titulos, ensure_ascii=False)))
+
+    def _filas(self, hoja):
+        return {f: json.loads(v) for f, v in self._con.execute(
+            "SELECT fila, valores FROM celdas WHERE hoja = ?", (hoja,))}
+
+    def leer(self, rangos):
+        salida = []
+        with self._lock:
+            for hoja, rango in rangos:
+                filas = self._filas(hoja)
+                grilla = a1_range_to_grid_range(rango) if rango else {}
+                desde = grilla.get("startRowIndex", 0) + 1
+                hasta = grilla.get("endRowIndex", max(filas, default=0))
+                c0, c1 = grilla.get("startColumnIndex", 0), grilla.get("endColumnIndex")
+                valores = []
+                for n in range(desde, hasta + 1):
+                    fila = filas.get(n, [])[c0:c1]
+                    # Como la API: sin celdas vacías al final de cada fila ni filas vacías al final
+                    while fila and fila[-1] == "":
+                        fila.pop()
+                    valores.append(fila)
+                while valores and not valores[-1]:
+                    valores.pop()
+                salida.append(valores)
+        return salida
+
+    def agregar(self, hoja, filas, value_input_option="RAW"):
+        with self._lock:
+            ultima = self._con.execute("SELECT MAX(fila) FROM celdas WHERE hoja = ?", (hoja,)).fetchone()[0] or 0
+            self._con.executemany(
+                "INSERT INTO celdas (hoja, fila, valores) VALUES (?, ?, ?)",
+                [(hoja, ultima + 1 + i, json.dumps([texto_celda(v) for v in f], ensure_ascii=False))
+                 for i, f in enumerate(filas)])
+        return ultima + 1
+
+    def actualizar(self, cambios):
+        with self._lock:
+            self._con.execute("BEGIN IMMEDIATE")
+            try:
+                for hoja, fila, col, valor in cambios:
+                    r = self._con.execute("SELECT valores FROM celdas WHERE hoja = ? AND fila = ?",
+                                          (hoja, fila)).fetchone()
+                    valores = json.loads(r[0]) if r else []
+                    valores.extend([""] * (col - len(valores)))
+                    valores[col - 1] = texto_celda(valor)
+                    self._con.execute("INSERT OR REPLACE INTO celdas (hoja, fila, valores) VALUES (?, ?, ?)",
+                                      (hoja, fila, json.dumps(valores, ensure_ascii=False)))
+                self._con.execute("COMMIT")
+            except Exception:
+                self._con.execute("ROLLBACK")
+                raise
+        return {}
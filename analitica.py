@@ -0,0 +1,83 @@
+import re
+import duckdb
+import pandas as pd
+import streamlit as st
+from conexion import MAIN_WORKSHEET_NAME
+from metricas import contar
+from vistas import vista_version, PROJECTS_WORKSHEET_NAME, SALES_WORKSHEET_NAME, HOJAS_DETALLE
+
+# --- ANALÍTICA EN SQL ---
+# Los tableros arman sus agrupaciones y cruces como SQL sobre DuckDB, que lee los DataFrames de
+# la réplica sin copiarlos (en columnas y en paralelo). El resultado de cada consulta se cachea
+# por (consulta, versiones de las hojas que usa): mientras las hojas no cambien, un rerun no
+# vuelve a calcular nada.
+
+# Nombre de cada tabla en SQL -> hoja (con las columnas derivadas de vistas.py)
+TABLAS = {
+    "evaluaciones": MAIN_WORKSHEET_NAME,
+    "proyectos": PROJECTS_WORKSHEET_NAME,
+    "ventas": SALES_WORKSHEET_NAME,
+    **{re.sub(r"\W+", "_", hoja.lower()).strip("_"): hoja for hoja in HOJAS_DETALLE},
+}
+
+
+# --- CONSULTAS DE LOS TABLEROS ---
+# Clientes registrados, proyectos y horas por sucursal
+RESUMEN_SUCURSALES_SQL = """
+    WITH c AS (
+        SELECT SUCURSAL, COUNT(DISTINCT "ID CLIENTE") AS REGISTRADOS
+        FROM evaluaciones WHERE SUCURSAL IS NOT NULL GROUP BY SUCURSAL
+    ), p AS (
+        SELECT SUCURSAL, COUNT(CLIENTE) AS PROYECTOS, SUM(TOTAL_HS) AS HORAS
+        FROM proyectos WHERE SUCURSAL IS NOT NULL GROUP BY SUCURSAL
+    )
+    SELECT CAST(c.SUCURSAL AS VARCHAR) AS SUCURSAL, c.REGISTRADOS,
+           COALESCE(p.PROYECTOS, 0) AS PROYECTOS, COALESCE(p.HORAS, 0) AS HORAS
+    FROM c LEFT JOIN p ON CAST(c.SUCURSAL AS VARCHAR) = CAST(p.SUCURSAL AS VARCHAR)
+    ORDER BY SUCURSAL
+"""
+
+# KPIs del embudo de ventas (el estado se compara en mayúsculas)
+KPIS_VENTAS_SQL = """
+    SELECT COALESCE(SUM(MONTO), 0) AS PIPELINE,
+           COALESCE(SUM(MONTO) FILTER (WHERE UPPER(CAST("ESTADO DE LA VENTA" AS VARCHAR)) = 'CERRADO'), 0) AS GANADO,
+           COUNT(*) FILTER (WHERE UPPER(CAST("ESTADO DE LA VENTA" AS VARCHAR)) = 'CERRADO') AS GANADAS,
+           COUNT(*) AS TOTAL
+    FROM ventas
+"""
+
+
+@st.cache_resource(max_entries=4 * len(TABLAS))
+def _tabla(nombre, version, _df):
+    """Frame que se registra en DuckDB: las columnas con números y texto mezclados (numericise) van como texto."""
+    mixtas = [c for c in _df.columns if _df[c].dtype == object and len(set(map(type, _df[c].dropna()))) > 1]
+    return _df.assign(**{c: _df[c].map(lambda v: None if pd.isna(v) else str(v)) for c in mixtas}) if mixtas else _df
+
+
+@st.cache_resource(max_entries=64)
+def _consultar(sql, versiones, _frames):
+    contar("sql.calculadas")
+    con = duckdb.connect()
+    try:
+        for nombre, df in _frames.items():
+            con.register(nombre, df)
+        return con.execute(sql).df()
+    finally:
+        con.close()
+
+
+def consultar(sql):
+    """Ejecuta la consulta sobre las tablas de TABLAS que menciona y devuelve un DataFrame (de solo lectura).
+
+    Si alguna de esas hojas está vacía o no se pudo cargar devuelve un DataFrame vacío.
+    """
+    contar("sql.pedidos")
+    frames, versiones = {}, []
+    for nombre, hoja in TABLAS.items():
+        if re.search(rf"\b{nombre}\b", sql, flags=re.IGNORECASE):
+            df, version = vista_version(hoja)
+            if version is None or df.empty:
+                return pd.DataFrame()
+            frames[nombre] = _tabla(nombre, version, df)
+            versiones.append((nombre, version))
+    return _consultar(sql, tuple(versiones), frames)
@@ -0,0 +1,253 @@
+"""Prueba de carga: sesiones concurrentes contra la planilla falsa (planilla_falsa.py).
+
+Simula el cierre de mes: N sesiones repartidas entre las sucursales usan la app a la vez con
+una mezcla de tableros, reportes, registros y ediciones. Reporta la latencia de cada rerun
+(p50/p95/p99), los requests por minuto a la API de Sheets contra la cuota y la tasa de
+aciertos de las cachés.
+
+    python benchmarks/carga.py --sesiones 25 --duracion 120 --filas 10000 --latencia 0.3
+    SMARTFARM_CACHE_TTL=60 python benchmarks/carga.py ...     # probar otros TTL
+
+Todas las sesiones corren en un mismo proceso, como en el servidor. AppTest no puede correr
+scripts en paralelo, así que cada sesión ejecuta el camino de datos del rerun de cada página
+(las mismas funciones de vistas, busqueda, analitica y conexion), sin dibujar los widgets.
+"""
+import os
+import sys
+import time
+import random
+import logging
+import argparse
+import tempfile
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime
+import numpy as np
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SUCURSALES = ["Córdoba", "Pilar", "Sinsacate", "Arroyito", "Santa Rosa"]
+MEZCLA = "tablero=50,reporte=25,registro=15,edicion=10"
+
+
+def _argumentos():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sesiones", type=int, default=25, help="sesiones concurrentes (se reparten por sucursal)")
+    parser.add_argument("--duracion", type=float, default=60, help="segundos de carga")
+    parser.add_argument("--filas", type=int, default=10_000, help="evaluaciones en Hoja 1 al empezar")
+    parser.add_argument("--latencia", type=float, default=0.3, help="segundos por request a la API")
+    parser.add_argument("--pausa", type=float, default=3.0, help="pausa media entre reruns de una sesión (s)")
+    parser.add_argument("--mezcla", default=MEZCLA, help=f"pesos de cada acción (por defecto {MEZCLA})")
+    parser.add_argument("--cuota", type=int, default=None,
+                        help="requests por minuto que acepta la API falsa (por defecto SMARTFARM_QUOTA_PER_MINUTE)")
+    parser.add_argument("--en-frio", action="store_true", help="no precargar la réplica antes de medir")
+    parser.add_argument("--semilla", type=int, default=1)
+    return parser.parse_args()
+
+
+# La configuración de la app se lee al importar conexion
+os.environ.setdefault("SMARTFARM_REPLICA_DIR", tempfile.mkdtemp(prefix="smartfarm-carga-"))
+os.environ["SMARTFARM_BACKEND"] = "sheets"
+os.chdir(RAIZ)
+sys.path.insert(0, RAIZ)
+
+import streamlit as st
+import planilla_falsa
+import metricas
+import conexion
+from conexion import load_data, agregar_fila, fila_registro, LoteEscritura, MAIN_WORKSHEET_NAME
+from evaluacion import EVALUATION_MAP, EVALUATION_CATEGORIES
+from vistas import (evaluaciones, evaluaciones_actuales, proyectos, registro_evaluacion, historial_cliente,
+                    brechas_items, hechos_evaluaciones, SALES_WORKSHEET_NAME)
+from busqueda import indice_evaluaciones, indice_clientes, indice_ventas
+from analitica import consultar, RESUMEN_SUCURSALES_SQL, KPIS_VENTAS_SQL
+from tendencias import rollup_mensual, certificacion_trimestral, tiempo_certificacion
+
+# Fuera de `streamlit run` cada st.* avisa que no hay ScriptRunContext
+logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").disabled = True
+
+
+# --- ACCIONES (camino de datos del rerun de cada página) ---
+
+def tablero(rnd, sucursal):
+    """Una de las páginas de tableros: Inicio, Proyectos, Ventas o Tendencias."""
+    pagina = rnd.choice(["inicio", "proyectos", "ventas", "tendencias"])
+    if pagina == "inicio":
+        df = evaluaciones_actuales()
+        df.groupby("SUCURSAL", observed=True)[conexion.COL_PUNTAJE].mean()
+    elif pagina == "proyectos":
+        evaluaciones_actuales()
+        indice_clientes()
+        p_df = proyectos()
+        evaluaciones()
+        p_df[p_df["SUCURSAL"] == sucursal]["TOTAL_HS"].sum()
+        consultar(RESUMEN_SUCURSALES_SQL)
+    elif pagina == "ventas":
+        evaluaciones_actuales()
+        indice_clientes()
+        indice_ventas()
+        load_data(SALES_WORKSHEET_NAME)
+        consultar(KPIS_VENTAS_SQL)
+    else:
+        evaluaciones_actuales()
+        mensual = rollup_mensual()
+        certificacion_trimestral(mensual, por="SUCURSAL")
+        tiempo_certificacion()
+    return pagina
+
+
+def reporte(rnd, sucursal):
+    """Reporte de cliente: búsqueda, evaluación elegida, historial y comparación."""
+    indice = indice_evaluaciones()
+    resultados = indice.buscar(sucursal)
+    if resultados:
+        id_cliente, fecha = rnd.choice(resultados)[0]
+        registro_evaluacion(id_cliente, fecha)
+        historial_cliente(id_cliente)
+    hechos_evaluaciones()
+    return "reporte"
+
+
+def registro(rnd, sucursal):
+    """Alta de una evaluación (Hoja 1 + hoja de detalle) y el rerun que la muestra."""
+    evaluaciones()
+    cat = rnd.choice(EVALUATION_CATEGORIES)
+    puntajes = [rnd.randint(0, maximo) for _, maximo, _ in EVALUATION_MAP[cat]["items"]]
+    id_cliente = str(rnd.randrange(9_000_000, 9_999_999))
+    ahora = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    agregar_fila(MAIN_WORKSHEET_NAME, [ahora, cat, id_cliente, f"Carga {id_cliente}", sucursal,
+                                       rnd.choice(planilla_falsa.TIPOS_CLIENTE), sum(puntajes)])
+    agregar_fila(EVALUATION_MAP[cat]["worksheet"], [ahora, id_cliente] + puntajes)
+    evaluaciones_actuales()
+    brechas_items()
+    return "registro"
+
+
+def edicion(rnd, sucursal):
+    """Cambio de estado de una venta (página de Ventas) y el rerun que la muestra."""
+    indice = indice_ventas()
+    resultados = indice.buscar(sucursal) or indice.buscar("")
+    if resultados:
+        id_venta = rnd.choice(resultados)[0]
+        fila = fila_registro(SALES_WORKSHEET_NAME, id_venta)
+        lote = LoteEscritura()
+        lote.actualizar(SALES_WORKSHEET_NAME, fila, 5, rnd.choice(planilla_falsa.ESTADOS_VENTA))
+        lote.actualizar(SALES_WORKSHEET_NAME, fila, 6, float(rnd.randrange(5, 500) * 100))
+        lote.enviar()
+    load_data(SALES_WORKSHEET_NAME)
+    consultar(KPIS_VENTAS_SQL)
+    return "edicion"
+
+
+ACCIONES = {"tablero": tablero, "reporte": reporte, "registro": registro, "edicion": edicion}
+
+
+# --- SESIONES ---
+
+def sesion(numero, fin, pesos, pausa, semilla, latencias, errores):
+    rnd = random.Random(semilla * 1000 + numero)
+    sucursal = SUCURSALES[numero % len(SUCURSALES)]
+    nombres = list(pesos)
+    # Las sesiones no arrancan todas en el mismo instante
+    time.sleep(rnd.uniform(0, pausa))
+    while time.monotonic() < fin:
+        accion = rnd.choices(nombres, [pesos[n] for n in nombres])[0]
+        inicio = time.perf_counter()
+        try:
+            detalle = ACCIONES[accion](rnd, sucursal)
+        except Exception as e:
+            errores[f"{accion}: {type(e).__name__}: {e}"[:160]] += 1
+            detalle = accion
+        latencias[accion].append(time.perf_counter() - inicio)
+        if detalle != accion:
+            latencias[f"{accion}/{detalle}"].append(latencias[accion][-1])
+        time.sleep(min(rnd.expovariate(1 / pausa), 4 * pausa) if pausa else 0)
+
+
+def _pico_por_minuto(momentos):
+    """Máximo de requests en cualquier ventana de 60 s."""
+    momentos = np.sort(np.asarray(momentos))
+    if not len(momentos):
+        return 0
+    return int((np.searchsorted(momentos, momentos + 60) - np.arange(len(momentos))).max())
+
+
+def _porcentaje(valor):
+    return "   -" if valor is None else f"{valor * 100:4.0f}%"
+
+
+def _reporte(latencias, errores, planilla, duracion, cuota):
+    print(f"\n{'acción':<22} {'reruns':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'máx ms':>8}")
+    todas = [t for nombre, ts in latencias.items() if "/" not in nombre for t in ts]
+    for nombre, ts in sorted(latencias.items()) + [("TOTAL", todas)]:
+        if ts:
+            p50, p95, p99 = np.percentile(np.asarray(ts) * 1000, [50, 95, 99])
+            print(f"{nombre:<22} {len(ts):>7} {p50:>8.0f} {p95:>8.0f} {p99:>8.0f} {max(ts) * 1000:>8.0f}")
+
+    total = sum(planilla.llamadas.values())
+    por_minuto = total / (duracion / 60)
+    pico = _pico_por_minuto([t for t, _ in planilla.registro])
+    print(f"\nAPI de Sheets: {total} requests en {duracion:.0f} s = {por_minuto:.1f}/min "
+          f"(pico {pico}/min, cuota {cuota}/min, {pico / cuota * 100:.0f}% usado en el pico); "
+          f"rechazados por cuota: {planilla.rechazadas}")
+    for metodo, n in planilla.llamadas.most_common():
+        print(f"  {metodo:<22} {n:>6}")
+
+    c = metricas.contadores()
+    reconstruidos = c["datos.armados"] + c["datos.instantanea"]
+    sin_esperar = c["replica.al_dia"] + c["replica.vieja"] + c["replica.disco"]
+    print("\nCachés (aciertos)")
+    print(f"  DataFrames por versión   {_porcentaje(metricas.tasa(c['datos.pedidos'] - reconstruidos, c['datos.pedidos']))}"
+          f"  ({c['datos.pedidos']} pedidos, {c['datos.armados']} armados, {c['datos.instantanea']} de instantánea)")
+    print(f"  Réplica sin esperar API  {_porcentaje(metricas.tasa(sin_esperar, sin_esperar + c['replica.espera'] + c['replica.fria']))}"
+          f"  (al día {c['replica.al_dia']}, vieja con refresco {c['replica.vieja']}, "
+          f"espera {c['replica.espera']}, en frío {c['replica.fria']})")
+    print(f"  Consultas SQL            {_porcentaje(metricas.tasa(c['sql.pedidos'] - c['sql.calculadas'], c['sql.pedidos']))}"
+          f"  ({c['sql.pedidos']} pedidos, {c['sql.calculadas']} calculadas)")
+    print(f"  Caché compartida         {_porcentaje(metricas.tasa(c['compartida.usadas'], c['compartida.usadas'] + c['hojas.leidas']))}"
+          f"  ({c['compartida.usadas']} hojas tomadas de otra instancia, {c['hojas.leidas']} leídas de la API)")
+
+    if errores:
+        print("\nErrores")
+        for mensaje, n in errores.most_common(10):
+            print(f"  {n:>5} × {mensaje}")
+
+
+def main():
+    args = _argumentos()
+    pesos = {k: float(v) for k, v in (p.split("=") for p in args.mezcla.split(","))}
+    desconocidas = set(pesos) - set(ACCIONES)
+    if desconocidas:
+        sys.exit(f"Acciones desconocidas en --mezcla: {', '.join(sorted(desconocidas))}")
+    cuota = args.cuota or conexion.QUOTA_PER_MINUTE
+
+    planilla = planilla_falsa.instalar(planilla_falsa.PlanillaFalsa(
+        planilla_falsa.generar_planilla(args.filas, semilla=args.semilla), latencia=args.latencia,
+        cuota_por_minuto=cuota, semilla=args.semilla))
+    st.secrets._secrets = planilla_falsa.SECRETS_FALSOS
+
+    if not args.en_frio:
+        # El servidor ya venía atendiendo: réplica y cachés cargadas
+        for ws_name in conexion.APP_WORKSHEETS:
+            load_data(ws_name)
+        reporte(random.Random(0), SUCURSALES[0])
+        for pagina in range(4):
+            tablero(random.Random(pagina), SUCURSALES[0])
+    planilla.reiniciar_contadores()
+    metricas.reiniciar()
+
+    print(f"{args.sesiones} sesiones, {args.duracion:.0f} s, {args.filas} evaluaciones, "
+          f"latencia {args.latencia * 1000:.0f} ms, mezcla {args.mezcla}")
+    latencias, errores = defaultdict(list), Counter()
+    inicio = time.monotonic()
+    fin = inicio + args.duracion
+    hilos = [threading.Thread(target=sesion, args=(n, fin, pesos, args.pausa, args.semilla, latencias, errores),
+                              daemon=True) for n in range(args.sesiones)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    _reporte(latencias, errores, planilla, time.monotonic() - inicio, cuota)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Benchmark de las páginas contra la planilla falsa (planilla_falsa.py).
+
+Renderiza Inicio.py y cada página con AppTest a distintos tamaños de Hoja 1 y reporta, por
+página: tiempo de la primera carga (réplica vacía) y de un rerun, requests a la API en cada
+una y memoria pico del proceso. Cada medición corre en un proceso nuevo.
+
+    python benchmarks/paginas.py                          # 100, 10.000 y 100.000 filas
+    python benchmarks/paginas.py --filas 10000 --latencia 0.3 --guardar base.json
+    python benchmarks/paginas.py --filas 10000 --latencia 0.3 --comparar base.json
+
+Con --comparar termina con código 1 si alguna página es más lenta que la base (más allá de
+--tolerancia) o hace más requests.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import resource
+import subprocess
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGINAS = ["Inicio.py"] + sorted(f"pages/{p}" for p in os.listdir(os.path.join(RAIZ, "pages")) if p.endswith(".py"))
+
+
+def _memoria_pico_mb():
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KB; macOS, bytes
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+
+
+def medir(filas, pagina, latencia, prob_error_cuota):
+    """Corre dentro del proceso hijo: una página, primera carga y rerun."""
+    os.chdir(RAIZ)
+    sys.path.insert(0, RAIZ)
+    import planilla_falsa
+    from streamlit.testing.v1 import AppTest
+
+    planilla = planilla_falsa.instalar(planilla_falsa.PlanillaFalsa(
+        planilla_falsa.generar_planilla(filas), latencia=latencia, prob_error_cuota=prob_error_cuota))
+    at = AppTest.from_file(os.path.join(RAIZ, pagina), default_timeout=900)
+    for clave, valor in planilla_falsa.SECRETS_FALSOS.items():
+        at.secrets[clave] = valor
+
+    resultado = {"filas": filas, "pagina": pagina, "memoria_base_mb": _memoria_pico_mb()}
+    for corrida in ("fria", "rerun"):
+        planilla.reiniciar_contadores()
+        inicio = time.perf_counter()
+        at.run()
+        resultado[f"{corrida}_s"] = time.perf_counter() - inicio
+        resultado[f"{corrida}_requests"] = sum(planilla.llamadas.values())
+        resultado[f"{corrida}_rechazados"] = planilla.rechazadas
+    resultado["memoria_pico_mb"] = _memoria_pico_mb()
+    resultado["errores"] = [str(e.value)[:200] for e in at.error] + [str(e.value)[:200] for e in at.exception]
+    return resultado
+
+
+def _en_proceso_nuevo(filas, pagina, args):
+    directorio = tempfile.mkdtemp(prefix="smartfarm-bench-")
+    try:
+        entorno = dict(os.environ, SMARTFARM_REPLICA_DIR=directorio, SMARTFARM_BACKEND="sheets",
+                       SMARTFARM_CACHE_COMPARTIDO="memoria")
+        proceso = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--_medir", str(filas), pagina,
+             "--latencia", str(args.latencia), "--errores-cuota", str(args.errores_cuota)],
+            env=entorno, capture_output=True, text=True)
+        lineas = [l for l in proceso.stdout.splitlines() if l.startswith("{")]
+        if proceso.returncode != 0 or not lineas:
+            return {"filas": filas, "pagina": pagina, "errores": [proceso.stderr.strip()[-500:]]}
+        return json.loads(lineas[-1])
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+def _imprimir(r):
+    if "fria_s" not in r:
+        print(f"{r['filas']:>7}  {r['pagina']:<32} FALLÓ: {r['errores']}")
+        return
+    print(f"{r['filas']:>7}  {r['pagina']:<32} {r['fria_s']:>7.2f} {r['fria_requests']:>4} {r['fria_rechazados']:>4} "
+          f"{r['rerun_s']:>8.2f} {r['rerun_requests']:>4} {r['memoria_pico_mb']:>8.0f} "
+          f"{r['memoria_pico_mb'] - r['memoria_base_mb']:>7.0f}  {'; '.join(r['errores'])}", flush=True)
+
+
+def _regresiones(resultados, base, tolerancia):
+    """Mediciones peores que la base: más lentas (con un margen mínimo de 50 ms) o con más requests."""
+    anteriores = {(b["filas"], b["pagina"]): b for b in base if "fria_s" in b}
+    salida = []
+    for r in resultados:
+        b = anteriores.get((r["filas"], r["pagina"]))
+        if b is None:
+            continue
+        if "fria_s" not in r:
+            salida.append(f"{r['pagina']} @ {r['filas']}: falló")
+            continue
+        for corrida in ("fria", "rerun"):
+            antes, ahora = b[f"{corrida}_s"], r[f"{corrida}_s"]
+            if ahora > antes * (1 + tolerancia) and ahora - antes > 0.05:
+                salida.append(f"{r['pagina']} @ {r['filas']}: {corrida} {antes:.2f}s -> {ahora:.2f}s")
+            if r[f"{corrida}_requests"] > b[f"{corrida}_requests"]:
+                salida.append(f"{r['pagina']} @ {r['filas']}: {corrida} "
+                              f"{b[f'{corrida}_requests']} -> {r[f'{corrida}_requests']} requests")
+    return salida
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filas", type=int, nargs="+", default=[100, 10_000, 100_000],
+                        help="evaluaciones en Hoja 1 (proyectos y ventas en proporción)")
+    parser.add_argument("--paginas", nargs="+", default=PAGINAS)
+    parser.add_argument("--latencia", type=float, default=0.0, help="segundos por request a la API")
+    parser.add_argument("--errores-cuota", type=float, default=0.0, help="probabilidad de 429 por request")
+    parser.add_argument("--guardar", help="guarda los resultados en este JSON")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior para detectar regresiones")
+    parser.add_argument("--tolerancia", type=float, default=0.25, help="margen de tiempo aceptado (0.25 = 25%%)")
+    parser.add_argument("--_medir", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args._medir:
+        print(json.dumps(medir(int(args._medir[0]), args._medir[1], args.latencia, args.errores_cuota)))
+        return 0
+
+    print(f"{'filas':>7}  {'página':<32} {'fría s':>7} {'req':>4} {'429':>4} {'rerun s':>8} {'req':>4} "
+          f"{'pico MB':>8} {'Δ MB':>7}  errores")
+    resultados = []
+    for filas in args.filas:
+        for pagina in args.paginas:
+            resultados.append(_en_proceso_nuevo(filas, pagina, args))
+            _imprimir(resultados[-1])
+    if args.guardar:
+        with open(args.guardar, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=1)
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            regresiones = _regresiones(resultados, json.load(f), args.tolerancia)
+        for r in regresiones:
+            print(f"REGRESIÓN {r}")
+        return 1 if regresiones else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
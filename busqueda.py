@@ -0,0 +1,187 @@
+import re
+import bisect
+import difflib
+import unicodedata
+from collections import defaultdict
+import streamlit as st
+from conexion import load_data_version, MAIN_WORKSHEET_NAME, COL_ID_REGISTRO
+from vistas import evaluaciones_actuales_version, PROJECTS_WORKSHEET_NAME, SALES_WORKSHEET_NAME
+from esquemas import FORMATO_FECHA_HORA
+
+# --- BÚSQUEDA DE REGISTROS ---
+# En lugar de mandar al navegador un selectbox con todas las filas, se busca en un índice
+# (cacheado por versión de la hoja) y solo se ofrecen los mejores resultados.
+
+# Cantidad de resultados que se ofrecen en el selectbox
+LIMITE_RESULTADOS = 20
+
+
+def normalizar_texto(texto):
+    """Minúsculas y sin acentos, para que 'cordoba' encuentre 'Córdoba'."""
+    texto = unicodedata.normalize("NFKD", str(texto)).encode("ascii", "ignore").decode("ascii")
+    return texto.lower()
+
+
+def _palabras(texto):
+    return re.findall(r"[a-z0-9]+", normalizar_texto(texto))
+
+
+class IndiceBusqueda:
+    """Índice invertido palabra -> registros, con búsqueda por prefijo y aproximada.
+
+    Cada registro tiene una clave estable (la que devuelve la búsqueda), una etiqueta para
+    mostrar y su fila en `datos`, el DataFrame con que se armó el índice (en el mismo orden
+    que las claves).
+    """
+
+    def __init__(self, claves, etiquetas, textos, datos=None):
+        self.claves = list(claves)
+        self.etiquetas = list(etiquetas)
+        self._datos = datos
+        self._posiciones = {clave: n for n, clave in enumerate(self.claves)}
+        registros = defaultdict(list)
+        for n, texto in enumerate(textos):
+            for palabra in set(_palabras(texto)):
+                registros[palabra].append(n)
+        self._registros = dict(registros)
+        self._vocabulario = sorted(self._registros)
+
+    def __len__(self):
+        return len(self.claves)
+
+    def registro(self, clave):
+        """Fila del registro con esa clave en los datos del índice (o None si no está)."""
+        n = self._posiciones.get(clave)
+        return None if n is None or self._datos is None else self._datos.iloc[n]
+
+    def _puntajes_termino(self, termino):
+        """Registros que coinciden con un término: exacto 3, prefijo 2, aproximado 1."""
+        puntajes = {}
+        i = bisect.bisect_left(self._vocabulario, termino)
+        while i < len(self._vocabulario) and self._vocabulario[i].startswith(termino):
+            palabra = self._vocabulario[i]
+            valor = 3 if palabra == termino else 2
+            for n in self._registros[palabra]:
+                puntajes[n] = max(puntajes.get(n, 0), valor)
+            i += 1
+        if not puntajes and len(termino) >= 3:
+            for palabra in difflib.get_close_matches(termino, self._vocabulario, n=5, cutoff=0.75):
+                for n in self._registros[palabra]:
+                    puntajes[n] = max(puntajes.get(n, 0), 1)
+        return puntajes
+
+    def buscar(self, consulta, limite=LIMITE_RESULTADOS):
+        """Mejores `limite` registros para la consulta como [(clave, etiqueta)]; todos los términos deben coincidir.
+
+        Sin consulta devuelve los últimos registros cargados.
+        """
+        terminos = _palabras(consulta)
+        if not terminos:
+            candidatos = range(len(self.claves) - 1, max(len(self.claves) - limite, 0) - 1, -1)
+            return [(self.claves[n], self.etiquetas[n]) for n in candidatos]
+
+        total = None
+        for termino in terminos:
+            puntajes = self._puntajes_termino(termino)
+            if total is None:
+                total = puntajes
+            else:
+                total = {n: total[n] + p for n, p in puntajes.items() if n in total}
+            if not total:
+                return []
+        # Mejor coincidencia primero; a igual puntaje, el registro más reciente
+        mejores = sorted(total, key=lambda n: (-total[n], -n))[:limite]
+        return [(self.claves[n], self.etiquetas[n]) for n in mejores]
+
+
+# --- ÍNDICES POR HOJA ---
+# Cada índice se arma con el DataFrame de la misma lectura que da su versión: si se leyera dos
+# veces, un refresco en el medio dejaría datos nuevos cacheados con la versión vieja.
+@st.cache_resource(max_entries=4)
+def _indice_evaluaciones(version, _df):
+    claves = list(zip(_df['ID CLIENTE'].astype(str), _df['FECHA Y HORA']))
+    base = _df['ID CLIENTE'].astype(str) + " - " + _df['CLIENTE'].astype(str)
+    etiquetas = base + " (" + _df['FECHA Y HORA'].dt.strftime(FORMATO_FECHA_HORA).fillna("") + ")"
+    textos = base + " " + _df['SUCURSAL'].astype(str)
+    return IndiceBusqueda(claves, etiquetas, textos, _df)
+
+
+def indice_evaluaciones():
+    """Una entrada por evaluación de Hoja 1; clave (ID CLIENTE, FECHA Y HORA)."""
+    df, version = load_data_version(MAIN_WORKSHEET_NAME)
+    if version is None or df.empty:
+        return IndiceBusqueda([], [], [])
+    return _indice_evaluaciones(version, df)
+
+
+@st.cache_resource(max_entries=4)
+def _indice_clientes(version, _df):
+    claves = _df['ID CLIENTE'].astype(str)
+    etiquetas = claves + " - " + _df['CLIENTE'].astype(str)
+    return IndiceBusqueda(claves, etiquetas, etiquetas + " " + _df['SUCURSAL'].astype(str), _df)
+
+
+def indice_clientes():
+    """Una entrada por cliente (su última evaluación); clave ID CLIENTE como texto."""
+    df, version = evaluaciones_actuales_version()
+    if version is None or df.empty:
+        return IndiceBusqueda([], [], [])
+    return _indice_clientes(version, df)
+
+
+def _con_id(df):
+    """Filas con ID REGISTRO (las que todavía no lo tienen no se pueden editar hasta la reconciliación)."""
+    if COL_ID_REGISTRO not in df.columns:
+        return df.iloc[0:0]
+    return df[df[COL_ID_REGISTRO].astype(str).str.strip().ne("")]
+
+
+@st.cache_resource(max_entries=4)
+def _indice_proyectos(version, _df):
+    df = _con_id(_df)
+    etiquetas = df['CLIENTE'].astype(str) + " | " + df['NOMBRE'].astype(str)
+    textos = df['ID CLIENTE'].astype(str) + " " + etiquetas + " " + df['SUCURSAL'].astype(str)
+    return IndiceBusqueda(df[COL_ID_REGISTRO].astype(str), etiquetas, textos, df)
+
+
+def indice_proyectos():
+    """Una entrada por proyecto de Proyectos Analyzer; clave ID REGISTRO."""
+    df, version = load_data_version(PROJECTS_WORKSHEET_NAME)
+    if version is None or df.empty or 'NOMBRE' not in df.columns:
+        return IndiceBusqueda([], [], [])
+    return _indice_proyectos(version, df)
+
+
+@st.cache_resource(max_entries=4)
+def _indice_ventas(version, _df):
+    df = _con_id(_df)
+    etiquetas = df['CLIENTE'].astype(str) + " | " + df['TIPO DE VENTA'].astype(str) + " | $" + \
+        df['MONTO'].astype(str)
+    textos = df['ID CLIENTE'].astype(str) + " " + etiquetas
+    return IndiceBusqueda(df[COL_ID_REGISTRO].astype(str), etiquetas, textos, df)
+
+
+def indice_ventas():
+    """Una entrada por venta de Ventas SmartFarm; clave ID REGISTRO."""
+    df, version = load_data_version(SALES_WORKSHEET_NAME)
+    if version is None or df.empty:
+        return IndiceBusqueda([], [], [])
+    return _indice_ventas(version, df)
+
+
+# --- WIDGET ---
+def selector_busqueda(indice, etiqueta, key, placeholder="ID, cliente o sucursal..."):
+    """Campo de búsqueda + selectbox con los mejores resultados. Devuelve la clave elegida o None.
+
+    Va fuera de los formularios: cada tecla vuelve a buscar, pero al navegador solo viajan
+    LIMITE_RESULTADOS opciones.
+    """
+    consulta = st.text_input(f"🔍 {etiqueta}", key=f"{key}_buscar", placeholder=placeholder)
+    resultados = indice.buscar(consulta)
+    if consulta and not resultados:
+        st.caption("Sin resultados para la búsqueda.")
+    etiquetas = dict(resultados)
+    opciones = [None] + [clave for clave, _ in resultados]
+    return st.selectbox(
+        "Resultados", opciones, key=f"{key}_resultado",
+        format_func=lambda c: "Seleccione un registro..." if c is None else etiquetas[c])
@@ -0,0 +1,166 @@
+import os
+import json
+import time
+import uuid
+import zlib
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+
+# --- CACHÉ COMPARTIDA ENTRE INSTANCIAS ---
+# Cuando corren varias instancias de la app (detrás de un balanceador) cada una tiene su
+# réplica local. Lo que una instancia lee de Sheets lo publica acá, y las demás lo toman en
+# lugar de pedirlo otra vez a la API. Los "leases" hacen que una sola instancia a la vez vaya
+# a buscar cada hoja (single-flight).
+#
+# SMARTFARM_CACHE_COMPARTIDO elige el backend:
+#   memoria            solo este proceso (una instancia; es el valor por defecto)
+#   sqlite[:ruta]      archivo SQLite compartido por los procesos de una misma máquina/volumen
+#   redis://host:port  Redis o cualquier servidor compatible (requiere el paquete redis)
+
+
+class CacheCompartido(ABC):
+    """Interfaz de los backends: valores con vencimiento y leases exclusivos por clave."""
+
+    @abstractmethod
+    def obtener(self, clave):
+        """Valor guardado (bytes) o None si no existe o venció."""
+
+    @abstractmethod
+    def guardar(self, clave, valor, ttl):
+        """Guarda el valor (bytes) durante ttl segundos."""
+
+    @abstractmethod
+    def tomar_lease(self, clave, ttl):
+        """Intenta tomar el lease; devuelve un token si lo consiguió o None si lo tiene otro."""
+
+    @abstractmethod
+    def liberar_lease(self, clave, token):
+        """Libera el lease solo si sigue siendo de quien tiene el token."""
+
+    # Los valores viajan como JSON comprimido
+    def obtener_json(self, clave):
+        valor = self.obtener(clave)
+        return None if valor is None else json.loads(zlib.decompress(valor))
+
+    def guardar_json(self, clave, valor, ttl):
+        self.guardar(clave, zlib.compress(json.dumps(valor, ensure_ascii=False).encode("utf-8")), ttl)
+
+
+class CacheMemoria(CacheCompartido):
+    """Backend en memoria del proceso (sirve para una sola instancia y para pruebas)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._valores = {}  # clave -> (valor, vence)
+        self._leases = {}   # clave -> (token, vence)
+
+    def obtener(self, clave):
+        with self._lock:
+            valor, vence = self._valores.get(clave, (None, 0))
+            return valor if vence > time.time() else None
+
+    def guardar(self, clave, valor, ttl):
+        with self._lock:
+            self._valores[clave] = (valor, time.time() + ttl)
+
+    def tomar_lease(self, clave, ttl):
+        with self._lock:
+            actual = self._leases.get(clave)
+            if actual is not None and actual[1] > time.time():
+                return None
+            token = uuid.uuid4().hex
+            self._leases[clave] = (token, time.time() + ttl)
+            return token
+
+    def liberar_lease(self, clave, token):
+        with self._lock:
+            if self._leases.get(clave, (None,))[0] == token:
+                del self._leases[clave]
+
+
+class CacheSQLite(CacheCompartido):
+    """Backend en un archivo SQLite; los leases se toman dentro de una transacción exclusiva."""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._con = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.executescript("""
+            CREATE TABLE IF NOT EXISTS valores (clave TEXT PRIMARY KEY, valor BLOB NOT NULL, vence REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS leases (clave TEXT PRIMARY KEY, token TEXT NOT NULL, vence REAL NOT NULL);
+        """)
+
+    def obtener(self, clave):
+        with self._lock:
+            r = self._con.execute("SELECT valor FROM valores WHERE clave = ? AND vence > ?",
+                                  (clave, time.time())).fetchone()
+        return r[0] if r else None
+
+    def guardar(self, clave, valor, ttl):
+        with self._lock:
+            ahora = time.time()
+            self._con.execute("INSERT OR REPLACE INTO valores (clave, valor, vence) VALUES (?, ?, ?)",
+                              (clave, valor, ahora + ttl))
+            self._con.execute("DELETE FROM valores WHERE vence <= ?", (ahora,))
+
+    def tomar_lease(self, clave, ttl):
+        token = uuid.uuid4().hex
+        with self._lock:
+            ahora = time.time()
+            self._con.execute("BEGIN IMMEDIATE")
+            try:
+                libre = self._con.execute("SELECT 1 FROM leases WHERE clave = ? AND vence > ?",
+                                          (clave, ahora)).fetchone() is None
+                if libre:
+                    self._con.execute("INSERT OR REPLACE INTO leases (clave, token, vence) VALUES (?, ?, ?)",
+                                      (clave, token, ahora + ttl))
+                self._con.execute("COMMIT")
+            except Exception:
+                self._con.execute("ROLLBACK")
+                raise
+        return token if libre else None
+
+    def liberar_lease(self, clave, token):
+        with self._lock:
+            self._con.execute("DELETE FROM leases WHERE clave = ? AND token = ?", (clave, token))
+
+
+class CacheRedis(CacheCompartido):
+    """Backend Redis (o compatible). El paquete redis solo se necesita si se usa este backend."""
+
+    # Borra el lease solo si el token coincide (atómico en el servidor)
+    _LIBERAR = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
+    def __init__(self, url, prefijo="smartfarm:"):
+        import redis
+        self._redis = redis.Redis.from_url(url)
+        self._prefijo = prefijo
+
+    def obtener(self, clave):
+        return self._redis.get(self._prefijo + clave)
+
+    def guardar(self, clave, valor, ttl):
+        self._redis.set(self._prefijo + clave, valor, px=int(ttl * 1000))
+
+    def tomar_lease(self, clave, ttl):
+        token = uuid.uuid4().hex
+        ok = self._redis.set(self._prefijo + "lease:" + clave, token, nx=True, px=int(ttl * 1000))
+        return token if ok else None
+
+    def liberar_lease(self, clave, token):
+        self._redis.eval(self._LIBERAR, 1, self._prefijo + "lease:" + clave, token)
+
+
+def crear_cache(url, directorio):
+    """Backend según SMARTFARM_CACHE_COMPARTIDO; `directorio` es donde va el archivo de sqlite por defecto."""
+    url = (url or "memoria").strip()
+    if url == "memoria":
+        return CacheMemoria()
+    if url == "sqlite" or url.startswith("sqlite:"):
+        ruta = url.partition(":")[2] or os.path.join(directorio, "compartido.db")
+        return CacheSQLite(ruta)
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return CacheRedis(url)
+    raise ValueError(f"Backend de caché compartida desconocido: {url}")
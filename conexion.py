@@ -1,14 +1,73 @@
 import os
+import time
+import logging
+import uuid
+import threading
 import gspread
 import streamlit as st
 import pandas as pd
 import socket
+from gspread.utils import numericise_all, rowcol_to_a1
+from replica import ReplicaLocal, REPLICA_DIR, clave_registro
+from cache_compartido import crear_cache
+from cuota import LimitadorCuota, llamar_con_reintentos
+from esquemas import aplicar_esquema, ENCABEZADOS
+from almacenamiento import AlmacenGoogleSheets, AlmacenLocal
+import instantaneas
+from metricas import contar
+
+logger = logging.getLogger(__name__)
 
 # --- CONSTANTES GLOBALES ---
 SHEET_ID = "17HdWAA_Taphajpj6l1h1zTlgIQrl6VbKIBWPZytlGgg"
 MAIN_WORKSHEET_NAME = "Hoja 1"
 COL_PUNTAJE = "PUNTAJE TOTAL SMARTFARM"
 
+# Hojas que se mantienen replicadas localmente
+APP_WORKSHEETS = [
+    MAIN_WORKSHEET_NAME,
+    "Granos",
+    "Ganadería",
+    "Cultivos de Alto Valor",
+    "Proyectos Analyzer",
+    "Ventas SmartFarm",
+]
+# Columna con el ID generado de cada registro en las hojas que se editan por fila, y el
+# prefijo de los IDs (no numérico, así numericise nunca lo convierte)
+COL_ID_REGISTRO = "ID REGISTRO"
+PREFIJOS_ID = {
+    "Proyectos Analyzer": "PRY",
+    "Ventas SmartFarm": "VTA",
+}
+# Columnas que identifican un registro en cada hoja (índice clave -> número de fila)
+ROW_KEYS = {
+    MAIN_WORKSHEET_NAME: ("ID CLIENTE", "FECHA Y HORA"),
+    "Granos": ("ID CLIENTE", "FECHA Y HORA"),
+    "Ganadería": ("ID CLIENTE", "FECHA Y HORA"),
+    "Cultivos de Alto Valor": ("ID CLIENTE", "FECHA Y HORA"),
+    **{ws_name: (COL_ID_REGISTRO,) for ws_name in PREFIJOS_ID},
+}
+# Cada cuántos segundos el hilo de fondo vuelve a traer las hojas
+SYNC_INTERVAL = int(os.getenv("SMARTFARM_SYNC_INTERVAL", "60"))
+# Stale-while-revalidate: pasados CACHE_TTL segundos desde la última sincronización se
+# sirve la copia local y se refresca en segundo plano; pasados MAX_STALENESS se espera
+CACHE_TTL = int(os.getenv("SMARTFARM_CACHE_TTL", "300"))
+MAX_STALENESS = int(os.getenv("SMARTFARM_MAX_STALENESS", "1800"))
+# Cuota de la API de Sheets por minuto (por usuario/cuenta de servicio) y tokens
+# reservados para escrituras
+QUOTA_PER_MINUTE = int(os.getenv("SMARTFARM_QUOTA_PER_MINUTE", "60"))
+QUOTA_WRITE_RESERVE = int(os.getenv("SMARTFARM_QUOTA_WRITE_RESERVE", "10"))
+# Entre reconciliaciones completas solo se leen las filas agregadas al final
+RECONCILE_INTERVAL = int(os.getenv("SMARTFARM_RECONCILE_INTERVAL", "900"))
+# Dónde están las hojas: "sheets" (Google Sheets) o "local[:ruta]" (base SQLite local, sin conexión)
+BACKEND = os.getenv("SMARTFARM_BACKEND", "sheets")
+# Caché compartida entre instancias de la app (ver cache_compartido.py): backend, cuánto dura
+# lo publicado, cuánto puede tardar una instancia en traer una hoja y cuánto la esperan las demás
+SHARED_CACHE = os.getenv("SMARTFARM_CACHE_COMPARTIDO", "memoria")
+SHARED_CACHE_TTL = int(os.getenv("SMARTFARM_CACHE_COMPARTIDO_TTL", str(MAX_STALENESS)))
+LEASE_TTL = int(os.getenv("SMARTFARM_LEASE_TTL", "60"))
+LEASE_WAIT = float(os.getenv("SMARTFARM_LEASE_WAIT", "10"))
+
 # --- CONFIGURACIÓN DE PROXY ---
 IS_CLOUD = os.getenv("STREAMLIT_RUNTIME_ENV") == "cloud"
 
@@ -71,23 +130,557 @@ def get_gspread_client():
         st.error(f"Error persistente en gspread: {e}")
         st.stop()
 
-@st.cache_data(ttl=300)
-def load_data(ws_name):
+# --- CUOTA DE LA API ---
+
+@st.cache_resource
+def get_limitador():
+    """Limitador único del proceso: toda llamada a la API de Sheets pasa por acá."""
+    return LimitadorCuota(QUOTA_PER_MINUTE, QUOTA_WRITE_RESERVE)
+
+
+def llamar_api(fn, *args, escritura=False, idempotente=True, **kwargs):
+    return llamar_con_reintentos(get_limitador(), fn, *args, escritura=escritura,
+                                 idempotente=idempotente, **kwargs)
+
+
+@st.cache_resource
+def get_cache_compartido():
+    return crear_cache(SHARED_CACHE, REPLICA_DIR)
+
+
+class _PlanillaConocida(gspread.Spreadsheet):
+    """Spreadsheet armado con metadatos ya conocidos: no los vuelve a pedir a la API (gspread 5.x)."""
+
+    def __init__(self, client, properties):
+        self.client = client
+        self._properties = properties
+
+
+@st.cache_resource(ttl=3600)
+def get_spreadsheet():
+    """Planilla abierta una sola vez. Los metadatos que trae open_by_key (una llamada a la API)
+    se comparten entre instancias por la caché compartida."""
+    cliente = get_gspread_client()
+    compartido = get_cache_compartido()
+    propiedades = compartido.obtener_json(f"planilla:{SHEET_ID}")
+    if propiedades is not None and isinstance(cliente, gspread.Client):
+        return _PlanillaConocida(cliente, propiedades)
+    planilla = llamar_api(cliente.open_by_key, SHEET_ID)
+    compartido.guardar_json(f"planilla:{SHEET_ID}", dict(getattr(planilla, "_properties", {"id": SHEET_ID})), 3600)
+    return planilla
+
+
+@st.cache_resource
+def get_almacen():
+    """Almacenamiento de las hojas según SMARTFARM_BACKEND (ver almacenamiento.py)."""
+    if BACKEND == "local" or BACKEND.startswith("local:"):
+        ruta = BACKEND.partition(":")[2] or os.path.join(REPLICA_DIR, "almacen.db")
+        return AlmacenLocal(ruta, encabezados=ENCABEZADOS)
+    if BACKEND == "sheets":
+        return AlmacenGoogleSheets(get_spreadsheet)
+    raise ValueError(f"Backend de almacenamiento desconocido: {BACKEND}")
+
+
+def agregar_fila(ws_name, fila, value_input_option="RAW"):
+    """Agrega una fila al final de la hoja (equivale a append_row, sin pedir el worksheet).
+
+    La fila se agrega también en la réplica, en el número de fila que informa el almacenamiento,
+    así la página siguiente la muestra sin volver a leer la hoja.
+    """
+    # Un append no es idempotente: solo se reintenta ante 429, que garantiza que no se aplicó
+    numero = llamar_api(get_almacen().agregar, ws_name, [fila], value_input_option,
+                        escritura=True, idempotente=False)
+    if not numero or not get_replica().aplicar_agregado(ws_name, numero, fila):
+        # Hay filas de otros que la réplica todavía no tiene: lectura delta
+        sincronizar_hoja(ws_name)
+    return numero
+
+
+def nuevo_id(ws_name):
+    return f"{PREFIJOS_ID[ws_name]}-{uuid.uuid4().hex[:12]}"
+
+
+def agregar_registro(ws_name, fila, value_input_option="RAW"):
+    """Como agregar_fila, pero completa la columna ID REGISTRO con un ID nuevo. Devuelve el ID."""
+    col = columnas_hoja(ws_name).get(COL_ID_REGISTRO)
+    if col is None:
+        # La hoja todavía no tiene la columna: la reconciliación la crea
+        sincronizar_hoja(ws_name, completa=True)
+        col = columnas_hoja(ws_name).get(COL_ID_REGISTRO)
+        if col is None:
+            raise RegistroNoEncontrado(f"La hoja '{ws_name}' no tiene la columna {COL_ID_REGISTRO}.")
+    id_registro = nuevo_id(ws_name)
+    fila = list(fila[:col - 1]) + [""] * (col - 1 - len(fila)) + [id_registro]
+    agregar_fila(ws_name, fila, value_input_option=value_input_option)
+    return id_registro
+
+
+# --- ESCRITURA EN LOTE ---
+
+class LoteEscritura:
+    """Junta los cambios de celdas de un envío y los manda en una sola llamada a la API.
+
+    Los cambios pueden ser de distintas hojas (por ejemplo la principal y la de detalle).
+    Los valores se interpretan como USER_ENTERED, igual que `update_cell`. Una vez enviados se
+    aplican también en la réplica.
+    """
+
+    def __init__(self):
+        self.cambios = []
+
+    def actualizar(self, ws_name, fila, col, valor):
+        self.cambios.append((ws_name, fila, col, valor))
+
+    def hojas(self):
+        return sorted({c[0] for c in self.cambios})
+
+    def enviar(self):
+        if not self.cambios:
+            return None
+        respuesta = llamar_api(get_almacen().actualizar, self.cambios, escritura=True)
+        replica = get_replica()
+        for ws_name in self.hojas():
+            replica.aplicar_celdas(ws_name, [c[1:] for c in self.cambios if c[0] == ws_name])
+        self.cambios = []
+        return respuesta
+
+
+# --- RÉPLICA LOCAL Y SINCRONIZACIÓN ---
+
+@st.cache_resource
+def get_replica():
+    return ReplicaLocal(claves=ROW_KEYS)
+
+
+class RegistroNoEncontrado(Exception):
+    """El registro que se quiere editar ya no está en la hoja."""
+
+
+def _completar_ids(ws_name):
+    """Escribe ID REGISTRO (y el encabezado, si falta) en las filas que no lo tienen.
+
+    Devuelve True si escribió algo; la hoja se tiene que volver a leer.
+    """
+    replica = get_replica()
+    encabezados, filas = replica.leer(ws_name)
+    if not encabezados:
+        return False
+    lote = LoteEscritura()
+    col = replica.columnas(ws_name).get(COL_ID_REGISTRO)
+    if col is None:
+        col = max(replica.estado(ws_name)["ancho"], len(encabezados)) + 1
+        lote.actualizar(ws_name, 1, col, COL_ID_REGISTRO)
+    for i, f in enumerate(filas):
+        # Las filas en blanco no son registros
+        if any(f) and (len(f) < col or not f[col - 1].strip()):
+            lote.actualizar(ws_name, i + 2, col, nuevo_id(ws_name))
+    if not lote.cambios:
+        return False
+    lote.enviar()
+    return True
+
+
+def _publicar(ws_name, leido, completa):
+    """Publica en la caché compartida la copia de la hoja recién leída de Sheets."""
+    estado = get_replica().estado(ws_name)
+    if estado is None or estado["pendiente"]:
+        # Tiene escrituras locales sin confirmar: no se reparten a las demás instancias
+        return
+    compartido = get_cache_compartido()
+    ahora = time.time()
+    previo = compartido.obtener_json(f"hoja:{ws_name}")
+    datos_vence = previo.get("datos_vence", 0) if previo else 0
+    if previo is None or previo["huella"] != estado["huella"] or datos_vence < ahora + SHARED_CACHE_TTL / 2:
+        encabezados, filas = get_replica().leer(ws_name)
+        compartido.guardar_json(f"datos:{ws_name}:{estado['huella']}", [encabezados] + filas, SHARED_CACHE_TTL)
+        datos_vence = ahora + SHARED_CACHE_TTL
+    compartido.guardar_json(f"hoja:{ws_name}", {"leido": leido, "huella": estado["huella"], "completa": completa,
+                                                "datos_vence": datos_vence}, SHARED_CACHE_TTL)
+
+
+def _tomar_publicado(ws_name, desde, completa=False):
+    """Aplica la copia que otra instancia leyó de Sheets después de `desde`.
+
+    Devuelve None si no hay una copia utilizable (hay que ir a la API); si no, si cambió la réplica.
+    `completa` exige que esa lectura haya sido una descarga completa.
+    """
+    publicado = get_cache_compartido().obtener_json(f"hoja:{ws_name}")
+    if publicado is None or publicado["leido"] <= desde or (completa and not publicado["completa"]):
+        return None
+    replica = get_replica()
+    estado = replica.estado(ws_name)
+    if estado is not None and estado["huella"] == publicado["huella"]:
+        return False if replica.confirmar(ws_name, publicado["huella"], publicado["leido"],
+                                          publicado["completa"]) else None
+    valores = get_cache_compartido().obtener_json(f"datos:{ws_name}:{publicado['huella']}")
+    if valores is None:
+        return None
+    if not replica.reemplazar(ws_name, valores, leido=publicado["leido"]):
+        # Hay una escritura local posterior a esa lectura
+        estado = replica.estado(ws_name)
+        return None if estado is None or estado["huella"] != publicado["huella"] else False
+    return True
+
+
+def sincronizar_hojas(*ws_names, completa=False):
+    """Actualiza la réplica local de las hojas indicadas (todas las de la app si no se indica
+    ninguna) con un único values_batch_get. Devuelve las hojas que cambiaron.
+
+    Las hojas solo crecen por append_row, así que normalmente basta con pedir las filas
+    posteriores a la última conocida. La descarga completa (que detecta ediciones y
+    borrados) se hace al inicio, cada RECONCILE_INTERVAL segundos, si se pide `completa` o si
+    hay escrituras aplicadas localmente que todavía no se confirmaron.
+
+    Antes de ir a la API se usa lo que otra instancia haya publicado en la caché compartida, y
+    se toma un lease por hoja: si otra instancia ya la está trayendo se espera su resultado
+    (hasta LEASE_WAIT segundos) en lugar de pedirla de nuevo.
+    """
+    replica = get_replica()
+    compartido = get_cache_compartido()
+    ahora = time.time()
+    cambiadas = []
+
+    hojas = []
+    for ws_name in ws_names or APP_WORKSHEETS:
+        estado = replica.estado(ws_name)
+        if not completa and estado is not None:
+            desde = max(estado["sincronizado"], estado["pendiente"], ahora - SYNC_INTERVAL)
+            usada = _tomar_publicado(ws_name, desde, completa=ahora - estado["reconciliado"] > RECONCILE_INTERVAL)
+            if usada is not None:
+                contar("compartida.usadas")
+                if usada:
+                    cambiadas.append(ws_name)
+                continue
+        hojas.append(ws_name)
+
+    # Single-flight: una sola instancia a la vez trae cada hoja
+    leases, esperando = {}, []
+    for ws_name in hojas:
+        token = compartido.tomar_lease(f"hoja:{ws_name}", LEASE_TTL)
+        if token is not None:
+            leases[ws_name] = token
+        else:
+            esperando.append(ws_name)
+    # Sirve cualquier lectura más nueva que la copia local al empezar a esperar (la otra instancia
+    # pudo empezar antes); se fija una vez, porque la réplica avanza si el lease es de este proceso
+    previos = {ws: replica.estado(ws) for ws in esperando}
+    limite = time.time() + (0 if completa else LEASE_WAIT)
+    while esperando and time.time() < limite:
+        time.sleep(0.25)
+        for ws_name in list(esperando):
+            previo, estado = previos[ws_name], replica.estado(ws_name)
+            if estado is not None and estado["sincronizado"] > ahora:
+                # Quien tenía el lease ya la sincronizó en esta misma réplica
+                contar("compartida.usadas")
+                esperando.remove(ws_name)
+                if previo is None or estado["version"] != previo["version"]:
+                    cambiadas.append(ws_name)
+                continue
+            desde = max(previo["sincronizado"], previo["pendiente"]) if previo is not None else 0
+            usada = _tomar_publicado(ws_name, desde)
+            if usada is not None:
+                contar("compartida.usadas")
+                esperando.remove(ws_name)
+                if usada:
+                    cambiadas.append(ws_name)
+    # Si la otra instancia no publicó a tiempo se trae igual
+    hojas = [ws for ws in hojas if ws in leases or ws in esperando]
     try:
-        client = get_gspread_client()
-        sh = client.open_by_key(SHEET_ID)
-        data = sh.worksheet(ws_name).get_all_records()
-        
-        if not data:
-            return pd.DataFrame()
-
-        df = pd.DataFrame(data)
-        # Normalización de columnas para evitar KeyErrors
-        df.columns = [str(c).strip().upper() for c in df.columns]
-        return df
+        pedidos = _leer_hojas(hojas, completa, ahora, cambiadas)
+
+        # En cada reconciliación se asigna ID REGISTRO a las filas cargadas sin él (a mano o antes
+        # de que existiera la columna); si falla la escritura se sigue con la copia leída
+        sin_id = []
+        for ws_name, es_completa, _ in pedidos:
+            if es_completa and ws_name in PREFIJOS_ID:
+                try:
+                    if _completar_ids(ws_name):
+                        sin_id.append(ws_name)
+                except Exception:
+                    logger.exception("Error asignando IDs en '%s'", ws_name)
+        if sin_id:
+            cambiadas = sorted(set(cambiadas) | set(sincronizar_hojas(*sin_id, completa=True)))
+
+        # Las hojas con IDs recién asignados ya se publicaron en la segunda lectura
+        for ws_name, es_completa, _ in pedidos:
+            if ws_name not in sin_id:
+                try:
+                    _publicar(ws_name, ahora, es_completa)
+                except Exception as e:
+                    logger.warning("Error publicando '%s' en la caché compartida: %s", ws_name, e)
+    finally:
+        for ws_name, token in leases.items():
+            compartido.liberar_lease(f"hoja:{ws_name}", token)
+    return cambiadas
+
+
+def _leer_hojas(ws_names, completa, ahora, cambiadas):
+    """Trae las hojas del almacenamiento en un solo pedido y las aplica a la réplica.
+
+    Agrega a `cambiadas` las que cambiaron y devuelve los pedidos hechos (hoja, es_completa, rango).
+    """
+    if not ws_names:
+        return []
+    replica = get_replica()
+    pedidos = []  # (hoja, es_completa, rango)
+    for ws_name in ws_names:
+        estado = replica.estado(ws_name)
+        if completa or estado is None or estado["pendiente"] or ahora - estado["reconciliado"] > RECONCILE_INTERVAL:
+            pedidos.append((ws_name, True, None))
+        else:
+            ultima_col = rowcol_to_a1(1, max(estado["ancho"], 1))[:-1]
+            pedidos.append((ws_name, False, f"A{estado['filas'] + 2}:{ultima_col}"))
+
+    leidos = llamar_api(get_almacen().leer, [(ws_name, rango) for ws_name, _, rango in pedidos])
+    contar("hojas.leidas", len(pedidos))
+    for (ws_name, es_completa, _), valores in zip(pedidos, leidos):
+        # Una lectura pedida antes de una escritura local no la pisa
+        cambio = replica.reemplazar(ws_name, valores, leido=ahora) if es_completa \
+            else replica.agregar(ws_name, valores, leido=ahora)
+        if cambio:
+            cambiadas.append(ws_name)
+    return pedidos
+
+
+def sincronizar_hoja(ws_name, completa=False):
+    """Actualiza la réplica de una sola hoja. Devuelve True si hubo cambios."""
+    return bool(sincronizar_hojas(ws_name, completa=completa))
+
+
+def ubicar_fila(ws_name, *clave):
+    """Número de fila en la hoja del registro con esa clave, sin leer la hoja.
+
+    El índice se mantiene en la réplica; si la clave no aparece se hace una lectura
+    delta por si el registro se agregó después de la última sincronización.
+    """
+    replica = get_replica()
+    fila = replica.fila_de(ws_name, *clave)
+    if fila is None:
+        sincronizar_hoja(ws_name)
+        fila = replica.fila_de(ws_name, *clave)
+    return fila
+
+
+def filas_registro(ws_names, *clave):
+    """Fila del registro con esa clave en cada una de las hojas, verificada antes de escribir.
+
+    El índice de la réplica puede haber quedado viejo (filas borradas u ordenadas a mano desde
+    la última reconciliación): se leen las celdas de la clave de todas las filas en un solo
+    request y, si alguna no coincide, se reconcilian esas hojas y se vuelve a buscar.
+    """
+    replica = get_replica()
+    filas, faltan = {}, list(ws_names)
+    for intento in range(2):
+        pedidos = []
+        for ws_name in faltan:
+            fila = ubicar_fila(ws_name, *clave)
+            cols = [replica.columnas(ws_name).get(c) for c in replica.claves[ws_name]]
+            if fila is not None and None not in cols:
+                pedidos.append((ws_name, fila, cols))
+        if pedidos:
+            rangos = [(ws_name, f"{rowcol_to_a1(fila, min(cols))}:{rowcol_to_a1(fila, max(cols))}")
+                      for ws_name, fila, cols in pedidos]
+            leidos = llamar_api(get_almacen().leer, rangos)
+            for (ws_name, fila, cols), leido in zip(pedidos, leidos):
+                celdas = (leido or [[]])[0]
+                valores = [celdas[c - min(cols)] if c - min(cols) < len(celdas) else "" for c in cols]
+                if clave_registro(valores) == clave_registro(clave):
+                    filas[ws_name] = fila
+        faltan = [ws_name for ws_name in ws_names if ws_name not in filas]
+        if not faltan:
+            return filas
+        if intento == 0:
+            sincronizar_hojas(*faltan, completa=True)
+    raise RegistroNoEncontrado(f"El registro {' / '.join(map(str, clave))} ya no está en la hoja '{faltan[0]}'.")
+
+
+def fila_registro(ws_name, id_registro):
+    """Número de fila del registro con ese ID REGISTRO, verificado contra la hoja antes de escribir.
+
+    Es filas_registro sobre una sola hoja: si la celda del ID ya no coincide (filas borradas o
+    movidas desde la última sincronización) se reconcilia la hoja y se vuelve a buscar.
+    """
+    return filas_registro([ws_name], id_registro)[ws_name]
+
+
+def columnas_hoja(ws_name):
+    """Mapa nombre de columna (en mayúsculas) -> número de columna de la hoja."""
+    replica = get_replica()
+    if replica.estado(ws_name) is None:
+        sincronizar_hoja(ws_name)
+    return replica.columnas(ws_name)
+
+
+_refrescos_en_curso = set()
+_refrescos_lock = threading.Lock()
+
+
+def _refrescar_en_segundo_plano(*ws_names):
+    """Lanza un hilo que sincroniza las hojas (en un solo request), salvo las que ya tienen uno en curso."""
+    with _refrescos_lock:
+        ws_names = [ws for ws in ws_names if ws not in _refrescos_en_curso]
+        if not ws_names:
+            return
+        _refrescos_en_curso.update(ws_names)
+
+    def _tarea():
+        try:
+            sincronizar_hojas(*ws_names)
+        except Exception:
+            logger.exception("Error refrescando %s", ws_names)
+        finally:
+            with _refrescos_lock:
+                _refrescos_en_curso.difference_update(ws_names)
+
+    threading.Thread(target=_tarea, name=f"smartfarm-refresh-{'-'.join(ws_names)}", daemon=True).start()
+
+
+def _bucle_sincronizacion():
+    while True:
+        time.sleep(SYNC_INTERVAL)
+        try:
+            sincronizar_hojas()
+        except Exception:
+            logger.exception("Error sincronizando las hojas")
+
+
+@st.cache_resource
+def iniciar_sincronizacion():
+    """Arranca (una sola vez por proceso) el hilo que mantiene la réplica al día."""
+    hilo = threading.Thread(target=_bucle_sincronizacion, name="smartfarm-sync", daemon=True)
+    hilo.start()
+    return hilo
+
+
+def _registros(encabezados, filas):
+    """Arma los registros igual que get_all_records (relleno de columnas y numericise)."""
+    ancho = max([len(encabezados)] + [len(f) for f in filas])
+    claves = list(encabezados) + [""] * (ancho - len(encabezados))
+    return [dict(zip(claves, numericise_all(f + [""] * (ancho - len(f))))) for f in filas]
+
+
+class VersionCambiada(Exception):
+    """La réplica cambió de versión mientras se leía la hoja."""
+
+
+@st.cache_resource(max_entries=4 * len(APP_WORKSHEETS))
+def _load_version(ws_name, version):
+    """DataFrame tipado de una versión concreta de la hoja; la versión forma parte de la clave de caché.
+
+    Es un objeto compartido por todas las sesiones (sin copia por llamada): no se debe modificar.
+    Si hay una instantánea en disco del mismo contenido (por ejemplo, después de un reinicio)
+    se usa esa; si no, se arma desde la réplica y se guarda la instantánea.
+    """
+    replica = get_replica()
+    estado = replica.estado(ws_name)
+    if estado is None or estado["version"] != version:
+        raise VersionCambiada(ws_name)
+    try:
+        df = instantaneas.cargar(ws_name, estado["huella"])
+        if df is not None:
+            contar("datos.instantanea")
+            return df
     except Exception as e:
-        st.error(f"Error cargando la hoja '{ws_name}': {e}")
+        logger.warning("No se pudo leer la instantánea de '%s': %s", ws_name, e)
+
+    leido = replica.leer(ws_name, version)
+    if leido is None:
+        # Se sincronizó entre la consulta del estado y la lectura: no se cachea otra versión con esta clave
+        raise VersionCambiada(ws_name)
+    data = _registros(*leido)
+    contar("datos.armados")
+
+    if not data:
         return pd.DataFrame()
 
+    df = pd.DataFrame(data)
+    # Normalización de columnas para evitar KeyErrors
+    df.columns = [str(c).strip().upper() for c in df.columns]
+    df = aplicar_esquema(ws_name, df)
+    try:
+        instantaneas.guardar(ws_name, estado["huella"], df)
+    except Exception as e:
+        logger.warning("No se pudo guardar la instantánea de '%s': %s", ws_name, e)
+    return df
+
+
+# Hojas ya revalidadas desde que arrancó el proceso
+_revalidadas = set()
 
 
+def estado_hoja(ws_name):
+    """Estado vigente de la hoja en la réplica (versión, generación, filas), sincronizando antes si hace falta.
+
+    Cada hoja tiene su propia versión en la réplica: al sincronizar una hoja que cambió
+    (por ejemplo después de una escritura) solo se invalida la caché de esa hoja.
+    Si la copia es más vieja que CACHE_TTL se sirve igual y se refresca en segundo plano;
+    solo si supera MAX_STALENESS la página espera a la sincronización. Al arrancar el
+    proceso la réplica que quedó en disco se sirve igual y se revalida en segundo plano.
+    """
+    iniciar_sincronizacion()
+    replica = get_replica()
+    estado = replica.estado(ws_name)
+    if estado is not None and ws_name not in _revalidadas:
+        # Primera lectura del proceso: se revalidan juntas todas las hojas viejas que quedaron en disco
+        viejas = []
+        for ws in APP_WORKSHEETS:
+            e = replica.estado(ws)
+            if ws not in _revalidadas and e is not None:
+                _revalidadas.add(ws)
+                if time.time() - e["sincronizado"] > CACHE_TTL:
+                    viejas.append(ws)
+        _revalidadas.add(ws_name)
+        if viejas:
+            _refrescar_en_segundo_plano(*viejas)
+        contar("replica.disco")
+        return estado
+    if estado is None:
+        contar("replica.fria")
+        # Arranque en frío: se trae la foto de todas las hojas en un solo request
+        faltantes = [ws for ws in APP_WORKSHEETS if replica.estado(ws) is None]
+        sincronizar_hojas(*(faltantes if ws_name in faltantes else [ws_name]))
+        estado = replica.estado(ws_name)
+    else:
+        edad = time.time() - estado["sincronizado"]
+        contar("replica.espera" if edad > MAX_STALENESS else "replica.vieja" if edad > CACHE_TTL else "replica.al_dia")
+        if edad > MAX_STALENESS:
+            try:
+                sincronizar_hojas(ws_name)
+                estado = replica.estado(ws_name)
+            except Exception as e:
+                # Mejor mostrar la última copia buena que un tablero vacío
+                st.warning(f"No se pudo actualizar '{ws_name}' ({e}). "
+                           f"Se muestran datos de hace {edad / 60:.0f} min.")
+        elif edad > CACHE_TTL:
+            _refrescar_en_segundo_plano(ws_name)
+    return estado
+
+
+def load_data_estado(ws_name):
+    """Como load_data, pero devuelve (DataFrame, estado de la réplica); el estado es None si la carga falló."""
+    contar("datos.pedidos")
+    try:
+        for intento in range(3):
+            estado = estado_hoja(ws_name)
+            try:
+                return _load_version(ws_name, estado["version"]), estado
+            except VersionCambiada:
+                if intento == 2:
+                    raise
+    except Exception as e:
+        st.error(f"Error cargando la hoja '{ws_name}': {e}")
+        return pd.DataFrame(), None
+
+
+def load_data_version(ws_name):
+    """Como load_data, pero devuelve (DataFrame, versión); la versión es None si la carga falló."""
+    df, estado = load_data_estado(ws_name)
+    return df, estado["version"] if estado is not None else None
+
+
+def load_data(ws_name):
+    """Devuelve la hoja desde la réplica local (DataFrame compartido de solo lectura).
+
+    Las columnas derivadas para las páginas se arman en vistas.py, no sobre este DataFrame.
+    """
+    return load_data_version(ws_name)[0]
@@ -0,0 +1,70 @@
+import time
+import random
+import threading
+import requests
+from gspread.exceptions import APIError
+
+# Códigos que indican cuota agotada o falla transitoria de Google
+CODIGOS_REINTENTABLES = {429, 500, 502, 503, 504}
+
+
+class LimitadorCuota:
+    """Token bucket compartido por todo el proceso para las llamadas a la API de Sheets.
+
+    Las lecturas no pueden consumir los últimos `reserva_escritura` tokens y además ceden
+    el paso mientras haya escrituras esperando, así un guardado no queda detrás de los
+    refrescos de los tableros.
+    """
+
+    def __init__(self, por_minuto=60, reserva_escritura=10):
+        self.capacidad = float(por_minuto)
+        self.tasa = por_minuto / 60.0
+        self.reserva = reserva_escritura
+        self.tokens = float(por_minuto)
+        self._ultimo = time.monotonic()
+        self._escrituras_esperando = 0
+        self._cond = threading.Condition()
+
+    def _reponer(self):
+        ahora = time.monotonic()
+        self.tokens = min(self.capacidad, self.tokens + (ahora - self._ultimo) * self.tasa)
+        self._ultimo = ahora
+
+    def adquirir(self, escritura=False):
+        """Bloquea hasta que haya un token disponible para la llamada."""
+        with self._cond:
+            if escritura:
+                self._escrituras_esperando += 1
+            try:
+                while True:
+                    self._reponer()
+                    minimo = 1 if escritura else 1 + self.reserva
+                    if self.tokens >= minimo and (escritura or self._escrituras_esperando == 0):
+                        self.tokens -= 1
+                        return
+                    self._cond.wait(timeout=max((minimo - self.tokens) / self.tasa, 0.05))
+            finally:
+                if escritura:
+                    self._escrituras_esperando -= 1
+                    self._cond.notify_all()
+
+
+def _es_reintentable(error, idempotente):
+    if isinstance(error, APIError):
+        codigo = error.response.status_code
+        # Un 5xx en una escritura no idempotente (append) pudo haberse aplicado igual
+        return codigo == 429 or (idempotente and codigo in CODIGOS_REINTENTABLES)
+    return idempotente and isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+
+def llamar_con_reintentos(limitador, fn, *args, escritura=False, idempotente=True,
+                          reintentos=5, espera_base=1.0, espera_max=32.0, **kwargs):
+    """Ejecuta `fn` respetando el limitador, con backoff exponencial y jitter ante 429/5xx."""
+    for intento in range(reintentos + 1):
+        limitador.adquirir(escritura)
+        try:
+            return fn(*args, **kwargs)
+        except Exception as e:
+            if intento == reintentos or not _es_reintentable(e, idempotente):
+                raise
+            time.sleep(random.uniform(0, min(espera_max, espera_base * 2 ** intento)))
@@ -0,0 +1,87 @@
+import pandas as pd
+from evaluacion import EVALUATION_MAP
+
+# Formatos con los que la app escribe las fechas en cada hoja
+FORMATO_FECHA_HORA = "%Y-%m-%d %H:%M:%S"
+FORMATO_FECHA_VENTA = "%d/%m/%Y"
+
+# Columnas clave que nunca se convierten a número en las hojas de detalle
+COLUMNAS_CLAVE = ["FECHA Y HORA", "ID CLIENTE"]
+
+# Esquema por hoja: columnas numéricas, categóricas (pocos valores distintos) y fechas.
+# "numericas": "resto" indica que todas las columnas que no son clave son puntajes.
+ESQUEMAS = {
+    "Hoja 1": {
+        "numericas": ["PUNTAJE TOTAL SMARTFARM"],
+        "categoricas": ["CATEGORÍA DE EVALUACIÓN", "SUCURSAL", "TIPO DE CLIENTE"],
+        "fechas": {"FECHA Y HORA": FORMATO_FECHA_HORA},
+    },
+    "Granos": {"numericas": "resto", "fechas": {"FECHA Y HORA": FORMATO_FECHA_HORA}},
+    "Ganadería": {"numericas": "resto", "fechas": {"FECHA Y HORA": FORMATO_FECHA_HORA}},
+    "Cultivos de Alto Valor": {"numericas": "resto", "fechas": {"FECHA Y HORA": FORMATO_FECHA_HORA}},
+    "Proyectos Analyzer": {
+        "numericas": ["PLANIFICACIÓN - HORAS", "RECOPILACIÓN DE DATOS - HORAS", "GENERACIÓN DE INFORME - HORAS"],
+        "categoricas": ["SUCURSAL", "PLANIFICACIÓN - ESTADO", "RECOPILACIÓN DE DATOS - ESTADO",
+                        "GENERACIÓN DE INFORME - ESTADO"],
+    },
+    "Ventas SmartFarm": {
+        "numericas": ["MONTO"],
+        "categoricas": ["TIPO DE VENTA", "ESTADO DE LA VENTA"],
+        "fechas": {"FECHA DE REGISTRO": FORMATO_FECHA_VENTA},
+    },
+}
+
+
+# Encabezados de cada hoja, en el orden en que la app escribe las filas. Sirven para crear las
+# hojas en el almacenamiento local (SMARTFARM_BACKEND=local); en Google Sheets ya existen.
+ENCABEZADOS = {
+    "Hoja 1": ["FECHA Y HORA", "CATEGORÍA DE EVALUACIÓN", "ID CLIENTE", "CLIENTE", "SUCURSAL", "TIPO DE CLIENTE",
+               "PUNTAJE TOTAL SMARTFARM"],
+    **{cfg["worksheet"]: ["FECHA Y HORA", "ID CLIENTE"] + [item[0] for item in cfg["items"]]
+       for cfg in EVALUATION_MAP.values()},
+    "Proyectos Analyzer": ["FECHA", "ID CLIENTE", "CLIENTE", "SUCURSAL", "CATEGORÍA", "TIPO", "NOMBRE", "UBICACIÓN",
+                           "PLANIFICACIÓN - ESTADO", "PLANIFICACIÓN - HORAS",
+                           "RECOPILACIÓN DE DATOS - ESTADO", "RECOPILACIÓN DE DATOS - HORAS",
+                           "GENERACIÓN DE INFORME - ESTADO", "GENERACIÓN DE INFORME - HORAS", "ID REGISTRO"],
+    "Ventas SmartFarm": ["FECHA DE REGISTRO", "ID CLIENTE", "CLIENTE", "TIPO DE VENTA", "ESTADO DE LA VENTA", "MONTO",
+                         "DETALLE DE LA OPORTUNIDAD/VENTA", "ID REGISTRO"],
+}
+
+def _numerica(serie):
+    """Convierte a número (vacíos y texto -> 0) con el tipo más chico que no pierde datos."""
+    serie = pd.to_numeric(serie, errors='coerce').fillna(0)
+    if (serie % 1 == 0).all() and serie.abs().max() < 2 ** 31:
+        return serie.astype("int32")
+    return serie.astype("float64")
+
+
+def _fecha(serie, formato):
+    fechas = pd.to_datetime(serie, format=formato, errors='coerce')
+    # Celdas editadas a mano con otro formato: se intenta un parseo flexible
+    faltan = fechas.isna() & serie.astype(str).str.strip().ne("")
+    if faltan.any():
+        fechas[faltan] = pd.to_datetime(serie[faltan], format="mixed", dayfirst=True, errors='coerce')
+    return fechas
+
+
+def aplicar_esquema(ws_name, df):
+    """Tipa las columnas de la hoja según ESQUEMAS (se hace una vez por versión de datos)."""
+    esquema = ESQUEMAS.get(ws_name)
+    if esquema is None or df.empty:
+        return df
+
+    numericas = esquema.get("numericas", [])
+    if numericas == "resto":
+        numericas = [c for c in df.columns if c not in COLUMNAS_CLAVE and c != ""]
+    for col in numericas:
+        if col in df.columns:
+            df[col] = _numerica(df[col])
+
+    for col in esquema.get("categoricas", []):
+        if col in df.columns:
+            df[col] = df[col].astype(str).astype("category")
+
+    for col, formato in esquema.get("fechas", {}).items():
+        if col in df.columns:
+            df[col] = _fecha(df[col], formato)
+    return df
@@ -0,0 +1,61 @@
+import os
+import re
+import glob
+import json
+import hashlib
+import pyarrow as pa
+import pyarrow.parquet as pq
+from replica import REPLICA_DIR
+from esquemas import ESQUEMAS
+
+# --- INSTANTÁNEAS DE LAS HOJAS ---
+# El DataFrame tipado de cada hoja se guarda en Parquet junto a la réplica. Al reiniciar el
+# servidor se lee de acá en lugar de volver a armarlo desde las filas (numericise + esquema).
+
+INSTANTANEAS_DIR = os.path.join(REPLICA_DIR, "instantaneas")
+# Clave en los metadatos del archivo con las columnas guardadas como JSON
+META_JSON = b"smartfarm_json"
+
+
+def _nombre(ws_name):
+    return re.sub(r"[^\w\-]+", "_", ws_name, flags=re.UNICODE).strip("_")
+
+
+def _ruta(ws_name, huella):
+    """Archivo de la instantánea: depende del contenido de la hoja (huella) y de su esquema."""
+    esquema = hashlib.sha1(repr(ESQUEMAS.get(ws_name)).encode("utf-8")).hexdigest()[:8]
+    return os.path.join(INSTANTANEAS_DIR, f"{_nombre(ws_name)}-{esquema}-{huella[:20]}.parquet")
+
+
+def guardar(ws_name, huella, df):
+    """Guarda la instantánea de la hoja y borra las anteriores."""
+    os.makedirs(INSTANTANEAS_DIR, exist_ok=True)
+    # Columnas con números y texto mezclados (numericise): Parquet no las admite, van como JSON
+    mixtas = [c for c in df.columns if df[c].dtype == object and len(set(map(type, df[c]))) > 1]
+    datos = df.assign(**{c: df[c].map(json.dumps) for c in mixtas}) if mixtas else df
+    tabla = pa.Table.from_pandas(datos, preserve_index=False)
+    tabla = tabla.replace_schema_metadata({**(tabla.schema.metadata or {}), META_JSON: json.dumps(mixtas)})
+
+    ruta = _ruta(ws_name, huella)
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    pq.write_table(tabla, temporal)
+    os.replace(temporal, ruta)
+    for vieja in glob.glob(os.path.join(INSTANTANEAS_DIR, f"{_nombre(ws_name)}-*.parquet")):
+        if vieja != ruta:
+            try:
+                os.remove(vieja)
+            except OSError:
+                pass
+
+
+def cargar(ws_name, huella):
+    """DataFrame de la instantánea con esa huella, o None si no hay."""
+    ruta = _ruta(ws_name, huella)
+    if not os.path.exists(ruta):
+        return None
+    tabla = pq.read_table(ruta)
+    mixtas = json.loads((tabla.schema.metadata or {}).get(META_JSON, b"[]"))
+    df = tabla.to_pandas()
+    for c in mixtas:
+        df[c] = df[c].map(json.loads)
+    return df
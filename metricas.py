@@ -0,0 +1,30 @@
+import threading
+from collections import Counter
+
+# --- MÉTRICAS DEL PROCESO ---
+# Contadores de eventos de las cachés (aciertos, reconstrucciones, lecturas a la API). Son
+# baratos y siempre están activos; los usa la prueba de carga (benchmarks/carga.py).
+
+_lock = threading.Lock()
+_contadores = Counter()
+
+
+def contar(evento, cantidad=1):
+    with _lock:
+        _contadores[evento] += cantidad
+
+
+def contadores():
+    """Copia de los contadores acumulados."""
+    with _lock:
+        return Counter(_contadores)
+
+
+def reiniciar():
+    with _lock:
+        _contadores.clear()
+
+
+def tasa(aciertos, total):
+    """Proporción de aciertos (None si no hubo pedidos)."""
+    return aciertos / total if total else None
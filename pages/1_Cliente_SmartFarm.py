@@ -1,14 +1,17 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
 from datetime import datetime
 from conexion import (
-    load_data,
-    get_gspread_client,
-    SHEET_ID,
+    agregar_fila,
+    filas_registro,
+    columnas_hoja,
+    LoteEscritura,
     MAIN_WORKSHEET_NAME,
     COL_PUNTAJE
 )
+from evaluacion import EVALUATION_MAP, EVALUATION_CATEGORIES, ESCALAS
+from vistas import evaluaciones, evaluaciones_actuales, registro_evaluacion, brechas_items
+from busqueda import indice_evaluaciones, selector_busqueda
 
 # -----------------------------------------------------------
 # CONFIGURACIÓN DE PÁGINA
@@ -20,91 +23,10 @@ st.set_page_config(
 )
 
 # --- CONSTANTES ---
-EVALUATION_CATEGORIES = ["Granos", "Ganadería", "Cultivos de Alto Valor"]
+# Categorías e items de la evaluación: ver evaluacion.py
 BRANCHES = ["Córdoba", "Pilar", "Sinsacate", "Arroyito", "Santa Rosa"]
 CLIENT_TYPES = ["Tipo 1", "Tipo 2", "Tipo 3"]
 
-# EVALUATION_MAP se mantiene igual (es tu configuración de entrada)
-EVALUATION_MAP = {
-    "Granos": {
-        "worksheet": "Granos",
-        "items": [
-            ("Item 1: Organización y estandarización de lotes.", 5, "Captura de pantalla desde Operations Center: Configuración/ Campos / Campos / Vista tabla. Excel o PDF de vista anterior. **-> Consideraciones:** En el caso de organizaciones con menos del 50% fuera del estándar, la puntuación de este ítem se restablece a cero. Caso contrario se otorgará el puntaje proporcional correspondiente: 50 a 60 % 1 punto | 60 a 70 % 2 puntos | 70 a 80% 3 puntos | 80 a 90 % 4 puntos | más de 90 % 5 puntos."),
-            ("Item 2: Línea de guiado.", 5, "Captura de pantalla desde Operations Center, de la tabla: Configuración/ Campos/ Filtro <campos sin guiado>; y Captura de pantalla desde Operations Center: Configuración/Campos/Campos totales (sin filtro aplicado). **-> Consideraciones:** Será requisito para obtener los 5 puntos, que el 20% de los lotes cuenten con guiado."),
-            ("Item 3: Organización altamente conectada.", 10, "Al menos un campo con tres tipos de labores cargadas."),
-            ("Item 4: Uso de planificador de trabajo.", 15,
-             "Video demostrativo de los Planes de Trabajo enviados al equipo durante los últimos 12 meses, al menos 4 meses antes de la presentación de la evidencia. **-> Consideraciones:** En los últimos 12 meses tener al menos una operación de cada una de las 3 etapas (siembra - pulverización - cosecha) en la cual se haya utilizando el planificador de trabajo. El trabajo necesariamente debe haber sido enviado al equipo y debe tener al menos un 20% de avance. Cada etapa contabiliza 5 puntos, siendo posible acumular 15 puntos al utilizar el planificador de trabajo en las 3 etapas."),
-            ("Item 5: Uso de Operations Center Mobile.", 10, "Grabación de video que demuestre la navegación en la plataforma Móvil, capturando la pantalla inicial y demostrando información de al menos un equipo y un mapa agronómico y la vista del planificador de trabajo. La ausencia de cualquiera de los ítems descritos anteriormente se considerará puntuación cero para este ítem; y Video del cliente mencionando los beneficios obtenidos al utilizar el Centro de Operaciones, hablando de al menos una ganancia al utilizarlo. **-> Consideraciones:** Al ser un testimonio auténtico y reciente creado para la evaluación de este ítem describiendo la principal funcionalidad utilizada (planificador de trabajo, alertas, analizador de campo) debe incluir un testimonio del cliente y/o miembros de su equipo. Serán descalificados los vídeos grabados que demuestren operaciones del Distribuidor y/o de terceros. Vídeo con una duración mínima de 1,5 minutos y máxima de 3 minutos."),
-            ("Item 6: JDLink.", 5, "Captura de pantalla desde Operations Center de la pestaña Equipo, que demuestre el Servicio de Conectividad JDLink; y Captura pantalla sin fitro, donde se visualice el total de máquinas. **-> Consideraciones:** En el caso de organizaciones con menos del 30% de máquinas con servicio de conectividad activado, la puntuación de este ítem se restablece a cero. Se otorgará el puntaje proporcional correspondiente: 30 a 40 % 1 punto | 40 a 50% 2 puntos | 50 a 60% 3 puntos | 60 a 70 % 4 puntos | más de 70% 5 puntos. Los dispositivos pendientes de transferencia y/o inactivos no se contarán."),
-            ("Item 7: Envío remoto. Mezcla de tanque.", 10, "Captura de pantalla desde Operations Center donde se vea una mezcla de tanque generada; o Captura de pantalla desde SIA evidenciando uso de ordenes de trabajo. **-> Consideraciones:** Para el caso de SIA los puntajes impactarán según se detalla a continuación: 20 a 30% 1 puntos | 30 a 40% 2 puntos | 40 a 50 % 5 puntos | más de 50% 10 puntos."),
-            ("Item 8: % uso de autotrac en Tractor.", 10, "Captura de pantalla en analizador de máquina/ uso de tecnología donde se muestren todos los equipos de la organización. **-> Consideraciones:** Se solicitará en promedio, un 40% de uso de autotrac en tractores de mas de 140 hp."),
-            ("Item 9: % uso autotrac Cosecha.", 10, "Captura de pantalla en analizador de máquina/ uso de tecnología donde se muestren todos los equipos de la organización. **-> Consideraciones:** Se solicitará en promedio, un 70% de uso de autotrac en cosechadoras."),
-            ("Item 10: % uso autotrac Pulverización.", 10, "Captura de pantalla en analizador de máquina/ uso de tecnología donde se muestren todos los equipos de la organización. **-> Consideraciones:** Se solicitará en promedio, un 70% de uso de autotrac en pulverizadoras."),
-            ("Item 11: Uso de funcionalidades avanzadas.", 15, "Reporte de uso de funcionalidades avanzadas: 7 Puntos | Vídeo testimonio de cliente que demuestre el uso de funcionalidades avanzadas: 8 puntos. **-> Consideraciones:** Sólo se considerarán videos que describan la fecha de la operación, la cual debe ser en el año agrícola en curso. El vídeo deberá registrar el testimonio por parte del cliente y/o miembros de su equipo. Serán descalificados los vídeos grabados que demuestren operaciones del Distribuidor y/o de terceros."),
-            ("Item 12: Uso de tecnologías integradas.", 10, "Captura de pantalla desde Operations Center, que evidencie el uso de tecnologías integradas. **-> Consideraciones:** Combine Advisor/ActiveYield: 4 puntos | ExactApply: 3 puntos | Control de sección: 3 puntos"),
-            ("Item 13: Señal de corrección StarFire.", 5, "Captura de pantalla desde Operations Center en Analizador de máquina/uso de tecnología. **-> Consideraciones:** Señal de corrección StarFire y/o RTK (SF2, SF3, SF-RTK y RTK) en al menos en una etapa del ciclo productivo. Se obtendrá 1 punto extra dentro del item si se utiliza señal SF-RTK."),
-            ("Item 14: Paquete CSC.", 10, "Factura del paquete contratado."),
-            ("Item 15: Vinculación de API.", 5, "Captura de pantalla desde Operations Center: Configuración / Conexiones / Seleccionar la herramienta conectada / Administrar / Organizaciones conectadas. **-> Consideraciones:** La fecha de conexión, que debe ser mayor a 4 meses desde la fecha de envío del informe."),
-            ("Item 16: JDLink en otra marca.", 15, "Captura de pantalla desde <Equipos> en Operations Center."),
-        ]
-    },
-    "Ganadería": {
-        "worksheet": "Ganadería",
-        "items": [
-            ("Item 1: Organización y estandarización de lotes.", 15, "Captura de pantalla desde Operations Center: Configuración/ Campos / Campos / Vista tabla. Excel o PDF de vista anterior. **-> Consideraciones:** En el caso de organizaciones con menos del 50% fuera del estándar, la puntuación de este ítem se restablece a cero. Caso contrario se otorgará el puntaje proporcional correspondiente: 50 a 60 % 1 punto | 60 a 70 % 3 puntos | 70 a 80% 9 puntos | 80 a 90 % 12 puntos | más de 90 % 15 puntos."),
-            ("Item 2: Digitalizar capa de siembra y mapa de picado.", 10,
-             "En al menos un lote tener digitalizada la capa de siembra y mapa de picado , que se evidenciará con una Captura de pantalla en el Analizador de Trabajo con la herramienta <comparar> , en la que se muestre el mapa de siembra y el mapa de picado dentro de la campaña. **-> Consideraciones:** Adicional de 5 puntos si se realizó alguna labor de manera variable (siembra o fertilización). Adicional de 5 puntos si en el lote hay lineas de guiado."),
-            ("Item 3: Uso de planificador de trabajo.", 20, "En los últimos 12 meses tener al menos una operación de cada una de las 3 etapas utilizando el planificador de trabajo. **-> Consideraciones:** Siembra vale 6 puntos | Pulverización 7 puntos | Cosecha 7 puntos | Las 3 etapas acumulan 20 puntos."),
-            ("Item 4: Equipo registrados en el Centro de Operaciones.", 5, "Video demostrativo de la organización donde se vea dos equipos y al menos un implemento asociado a la alimentación en cargador frontal."),
-            ("Item 5: Operadores registrados en el Centro de Operaciones.", 5,
-             "Video que demuestra el registro de al menos un empleado en la pestaña equipo en Operations Center."),
-            ("Item 6: Productos registrados en el Centro de Operaciones.", 5, "Video de la pestaña <Productos> demostrando los químicos, variedades, fertilizantes, mezcla (si se usa), con al menos un producto químico o variedad registrada."),
-            ("Item 7: Uso de Operations Center Mobile.", 10, "Grabación de video que demuestre la navegación en la plataforma Móvil, capturando la pantalla inicial y demostrando información de al menos un equipo y un mapa agronómico y la vista del planificador de trabajo. La ausencia de cualquiera de los ítems descritos anteriormente se considerará puntuación cero para este ítem; y Testimonio de cliente con el beneficio de utilizar el Centro de Operaciones mencionando los beneficios obtenidos al utilizar el Centro de Operaciones, hablando de al menos una ganancia al utilizarlo. **-> Consideraciones:** Al ser un testimonio auténtico y reciente creado para la evaluación de este ítem describiendo la principal funcionalidad utilizada (planificador de trabajo, alertas, analizador de campo) debe incluir un testimonio del cliente y/o miembros de su equipo. Serán descalificados los vídeos grabados que demuestren operaciones del Distribuidor y/o de terceros. Vídeo con una duración mínima de 1,5 minutos y máxima de 3 minutos."),
-            ("Item 8: JDLink activado en máquinas John Deere.", 10, "Captura de pantalla desde Operations Center de la pestaña Equipo, que demuestre el Servicio de Conectividad JDLink; y Captura pantalla sin filtro, donde se visualice el total de máquinas. **-> Consideraciones:** En el caso de organizaciones con menos del 30% de máquinas con servicio de conectividad activado, la puntuación de este ítem se restablece a cero. Se otorgará el puntaje proporcional correspondiente: 30 a 40 % 1 punto | 40 a 50% 2 puntos | 50 a 60% 4 puntos | 60 a 70 % 6 puntos | más de 70% 10 puntos. Los dispositivos pendientes de transferencia y/o inactivos no se contarán."),
-            ("Item 9: Planes de mantenimiento en tractores.", 10, "Captura de pantalla de los planes de mantenimiento asociado a tractores responsables de la alimentación."),
-            ("Item 10: Mapeo de constituyentes.", 20, "10 puntos con al menos un mapa de constituyentes en los últimos 12 meses. 10 puntos por testimonial de importancia de sensado de constituyentes."),
-            ("Item 11: Conectividad alimentación.", 20, "Al menos un tractor con conectividad visible en Operations Center. Evidencia captura de pantalla o video demostrando el recorrido en el patio de comida.."),
-            ("Item 12: Generación de informes.", 10, "Captura de pantalla desde Archivos/ Informes donde se visualice al menos un informe de máquina generado en los últimos doce meses. La fecha debe ser mayor a 4 meses desde la fecha de envío del informe."),
-            ("Item 13: Paquete contratado con el concesionario (CSC).", 10, "Factura del paquete contratado."),
-        ]
-    },
-    "Cultivos de Alto Valor": {
-        "worksheet": "Cultivos de Alto Valor",
-        "items": [
-            ("Item 1: Organización y estandarización de lotes.", 15, "Captura de pantalla desde Operations Center: Configuración/ Campos / Campos / Vista tabla. Excel o PDF de vista anterior. **-> Consideraciones:** En el caso de organizaciones con menos del 50% fuera del estándar, la puntuación de este ítem se restablece a cero. Caso contrario se otorgará el puntaje proporcional correspondiente: 50 a 60 % 1 punto | 60 a 70 % 3 puntos | 70 a 80% 9 puntos | 80 a 90 % 12 puntos | más de 90 % 15 puntos."),
-            ("Item 2: Lineas de guiado.", 5, "Captura de pantalla desde Operations Center, de la tabla: Configuración/ Campos/ Filtro <campos sin guiado> y, Captura de pantalla desde Operations Center: Configuración/Campos/Campos totales (sin filtro aplicado). **-> Consideraciones:** Será requisito para obtener los 5 puntos, que el 20% de los lotes cuenten con guiado."),
-            ("Item 3: Tener al menos una labor digitalizada.", 10, "Tener una operación digitalizada. Presentar el pdf del informe del Analizador de Trabajo de cualquier operación, ya sea preparación de suelo, siembra, pulverización o cosecha que se haya realizado."),
-            ("Item 4: Uso de planificador de trabajo para alguna operación.", 15, "Captura de pantalla en la sección planificador de trabajo con al menos un trabajo enviado en los últimos 12 meses."),
-            ("Item 5: Uso del Operations Center Mobile.", 10, "Grabación de video que demuestre la navegación en la plataforma Móvil, capturando la pantalla inicial y demostrando información de al menos un equipo y un mapa agronómico y la vista del planificador de trabajo. La ausencia de cualquiera de los ítems descritos anteriormente se considerará puntuación cero para este ítem y, Video del cliente mencionando los beneficios obtenidos al utilizar el Centro de Operaciones, hablando de al menos una ganancia al utilizarlo. **-> Consideraciones:** Al ser un testimonio auténtico y reciente creado para la evaluación de este ítem describiendo la principal funcionalidad utilizada (planificador de trabajo, alertas, analizador de campo) debe incluir un testimonio del cliente y/o miembros de su equipo. Serán descalificados los vídeos grabados que demuestren operaciones del Distribuidor y/o de terceros. Vídeo con una duración mínima de 1,5 minutos y máxima de 3 minutos."),
-            ("Item 6: JDLink activado en máquinas John Deere.", 10, "Captura de pantalla desde Operations Center de la pestaña Equipo, que demuestre el Servicio de Conectividad JDLink; y Captura pantalla sin filtro, donde se visualice el total de máquinas. **-> Consideraciones:** En el caso de organizaciones con menos del 30% de máquinas con servicio de conectividad activado, la puntuación de este ítem se restablece a cero. Se otorgará el puntaje proporcional correspondiente: 30 a 40 % 1 punto | 40 a 50% 2 puntos | 50 a 60% 4 puntos | 60 a 70 % 6 puntos | más de 70% 10 puntos. Los dispositivos pendientes de transferencia y/o inactivos no se contarán."),
-            ("Item 7: % uso de autotrac en Tractor.", 20, "Captura de pantalla en analizador de máquina/ uso de tecnología donde se muestren todos los equipos de la organización. **-> Consideraciones:** Se solicitará en promedio, un 30% de uso de autotrac en tractores de mas de 140 hp."),
-            ("Item 8: Implement Guidance.", 20, "Vídeo testimonio de cliente de funcionalidad avanzada. Solo se considerarán videos que describan la fecha de la operación, la cual debe ser en el año agrícola en curso. El vídeo deberá registrar el testimonio por parte del cliente y/o miembros de su equipo. Serán descalificados los vídeos grabados que demuestren operaciones del Distribuidor y/o de terceros. **-> Consideraciones:** Puede considerarse nivelación para México."),
-            ("Item 9: Señal de corrección StarFire.", 10, "Captura de pantalla desde Operations Center en Analizador de máquina/uso de tecnología. **-> Consideraciones:** Señal de corrección StarFire y/o RTK (SF2, SF3, SF-RTK y RTK) en al menos en una etapa del ciclo productivo. Se obtendrá 1 punto extra dentro del item si se utiliza señal SF-RTK."),
-            ("Item 10: Paquete contratado con el concesionario (CSC).", 10, "Factura del paquete contratado."),
-            ("Item 11: Equipos Registrados en Operations Center.", 5, "Video demostrativo de la organización donde se vea dos equipos y al menos un implemento."),
-            ("Item 12: Operadores registrados en Operations Center.", 5, "Video que demuestra el registro de al menos un empleado en la pestaña equipo en Operations Center."),
-            ("Item 13: Productos registrados en el Operations Center.", 5, "Video de la pestaña Productos demostrando los químicos, variedades, fertilizantes, mezcla (si se usa), con al menos un producto químico o variedad registrada."),
-            ("Item 14: Configuración de Alertas Personalizables.", 10, "Captura de pantalla de alguna alerta personalizable mostrando la fecha que debe ser mayor a 4 meses desde la fecha del envío del informe."),
-        ]
-    }
-}
-
-
-# --- FUNCIONES AUXILIARES ---
-def get_row_index(worksheet, id_cliente, timestamp):
-    data = worksheet.get_all_values()
-    if not data: return None
-    df_idx = pd.DataFrame(data[1:], columns=data[0])
-    # Normalizamos columnas para búsqueda segura: 'ID CLIENTE' y 'FECHA DE REGISTRO'
-    df_idx.columns = [c.strip().upper() for c in df_idx.columns]
-
-    # IMPORTANTE: Usamos los nombres normalizados en mayúsculas
-    match = df_idx[
-        (df_idx['ID CLIENTE'].astype(str) == str(id_cliente)) &
-        (df_idx['FECHA Y HORA'].astype(str) == str(timestamp))
-        ]
-    return match.index[0] + 2 if not match.empty else None
-
 
 # -----------------------------------------------------------
 # INTERFAZ PRINCIPAL
@@ -142,17 +64,12 @@ with t1:
                 try:
                     now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
                     total = sum(scores.values())
-                    client = get_gspread_client()
-                    sh = client.open_by_key(SHEET_ID)
-
                     # Guardar en Hoja Principal
-                    sh.worksheet(MAIN_WORKSHEET_NAME).append_row([now, cat_seleccionada, id_c, nom, suc, tip, total])
+                    agregar_fila(MAIN_WORKSHEET_NAME, [now, cat_seleccionada, id_c, nom, suc, tip, total])
                     # Guardar en Hoja Detalle
-                    sh.worksheet(EVALUATION_MAP[cat_seleccionada]["worksheet"]).append_row(
-                        [now, id_c] + list(scores.values()))
+                    agregar_fila(EVALUATION_MAP[cat_seleccionada]["worksheet"], [now, id_c] + list(scores.values()))
 
                     st.success("¡Cliente registrado!")
-                    st.cache_data.clear()
                 except Exception as e:
                     st.error(f"Error: {e}")
             else:
@@ -162,27 +79,20 @@ with t1:
 
 # --- TAB 2: MODIFICAR (Corregido con Mayúsculas) ---
 with t2:
-    df_m = load_data(MAIN_WORKSHEET_NAME)
+    df_m = evaluaciones()
     if not df_m.empty:
-        # Usamos nombres en mayúsculas: 'ID CLIENTE' y 'CLIENTE'
-        df_m['LABEL'] = df_m['ID CLIENTE'].astype(str) + " - " + df_m['CLIENTE'].astype(str)
-        choice = st.selectbox("Seleccione para editar", ["..."] + df_m['LABEL'].tolist())
+        indice = indice_evaluaciones()
+        clave = selector_busqueda(indice, "Seleccione para editar", key="modificar")
 
-        if choice != "...":
-            sel_row = df_m[df_m['LABEL'] == choice].iloc[0]
+        # Registro elegido, de la misma lectura de la hoja que armó el índice
+        sel_row = indice.registro(clave) if clave is not None else None
+        if sel_row is not None:
             cat = sel_row['CATEGORÍA DE EVALUACIÓN']
 
-            # Cargar datos de la hoja específica
-            df_detail = load_data(EVALUATION_MAP[cat]["worksheet"])
-
-            # Filtro corregido con Mayúsculas
-            detail_match = df_detail[
-                (df_detail['ID CLIENTE'].astype(str) == str(sel_row['ID CLIENTE'])) &
-                (df_detail['FECHA Y HORA'].astype(str) == str(sel_row['FECHA Y HORA']))
-                ]
+            # Detalle de la evaluación desde la tabla de hechos (búsqueda por clave)
+            ev_row = registro_evaluacion(*clave)
 
-            if not detail_match.empty:
-                ev_row = detail_match.iloc[0]
+            if ev_row is not None:
                 with st.form("f_mod_cliente"):
                     st.subheader(f"Editando: {sel_row['CLIENTE']}")
                     new_nom = st.text_input("Nombre", sel_row['CLIENTE'])
@@ -199,30 +109,32 @@ with t2:
 
                     if st.form_submit_button("💾 Actualizar"):
                         try:
-                            client = get_gspread_client()
-                            sh = client.open_by_key(SHEET_ID)
+                            lote = LoteEscritura()
+                            ws_det = EVALUATION_MAP[cat]["worksheet"]
+
+                            # Filas salen del índice de la réplica y se verifican contra las dos hojas
+                            # en un solo request; las columnas, de los encabezados ya replicados
+                            filas = filas_registro([MAIN_WORKSHEET_NAME, ws_det],
+                                                   sel_row['ID CLIENTE'], sel_row['FECHA Y HORA'])
 
                             # Update Main
-                            ws1 = sh.worksheet(MAIN_WORKSHEET_NAME)
-                            idx1 = get_row_index(ws1, sel_row['ID CLIENTE'], sel_row['FECHA Y HORA'])
-                            if idx1:
-                                ws1.update_cell(idx1, 4, new_nom)
-                                ws1.update_cell(idx1, 5, new_suc)
-                                ws1.update_cell(idx1, 7, sum(new_scores.values()))
+                            idx1 = filas[MAIN_WORKSHEET_NAME]
+                            cols1 = columnas_hoja(MAIN_WORKSHEET_NAME)
+                            lote.actualizar(MAIN_WORKSHEET_NAME, idx1, cols1['CLIENTE'], new_nom)
+                            lote.actualizar(MAIN_WORKSHEET_NAME, idx1, cols1['SUCURSAL'], new_suc)
+                            lote.actualizar(MAIN_WORKSHEET_NAME, idx1, cols1[COL_PUNTAJE], sum(new_scores.values()))
 
                             # Update Detail
-                            ws2 = sh.worksheet(EVALUATION_MAP[cat]["worksheet"])
-                            idx2 = get_row_index(ws2, sel_row['ID CLIENTE'], sel_row['FECHA Y HORA'])
-                            if idx2:
-                                # Obtenemos headers de la hoja real para saber la columna exacta
-                                headers = [h.strip().upper() for h in ws2.row_values(1)]
-                                for k, v in new_scores.items():
-                                    if k.strip().upper() in headers:
-                                        col_idx = headers.index(k.strip().upper()) + 1
-                                        ws2.update_cell(idx2, col_idx, v)
+                            idx2 = filas[ws_det]
+                            headers = columnas_hoja(ws_det)
+                            for k, v in new_scores.items():
+                                if k.strip().upper() in headers:
+                                    lote.actualizar(ws_det, idx2, headers[k.strip().upper()], v)
+
+                            # Un solo request para la hoja principal y la de detalle
+                            lote.enviar()
 
                             st.success("¡Datos actualizados!")
-                            st.cache_data.clear()
                             st.rerun()
                         except Exception as e:
                             st.error(f"Error: {e}")
@@ -234,15 +146,13 @@ with t2:
 
 # --- TAB 3: DASHBOARD ---
 with t3:
-    df_a = load_data(MAIN_WORKSHEET_NAME)
+    # Ranking y certificación sobre la última evaluación de cada cliente
+    df_a = evaluaciones_actuales()
     if not df_a.empty:
         # Normalizamos nombres de columnas técnicos
         target = COL_PUNTAJE.upper()  # "PUNTAJE TOTAL SMARTFARM"
         col_cat = 'CATEGORÍA DE EVALUACIÓN'
         col_suc = 'SUCURSAL'
-        META_CERTIFICACION = 105
-
-        df_a[target] = pd.to_numeric(df_a[target], errors='coerce').fillna(0)
 
         # Filtros rápidos
         c1, c2 = st.columns(2)
@@ -271,7 +181,7 @@ with t3:
                 st.plotly_chart(fig_pie, use_container_width=True)
 
             with col_g2:
-                stats_cat = df_f.groupby(col_cat)[target].agg(['sum', 'mean']).reset_index()
+                stats_cat = df_f.groupby(col_cat, observed=True)[target].agg(['sum', 'mean']).reset_index()
                 stats_cat.columns = [col_cat, 'Puntaje Acumulado', 'Puntaje Promedio']
                 fig_bar_cat = px.bar(stats_cat, x=col_cat, y=['Puntaje Acumulado', 'Puntaje Promedio'],
                                      barmode='group', title="📈 Rendimiento por Categoría")
@@ -282,11 +192,9 @@ with t3:
             # --- NUEVA SECCIÓN: DESEMPEÑO Y CERTIFICACIÓN POR SUCURSAL ---
             st.subheader("🏢 Desempeño y Certificación por Sucursal")
 
-            # 1. Creamos una columna booleana para saber quién certificó
-            df_f['CERTIFICA'] = df_f[target] >= META_CERTIFICACION
-
+            # 1. La columna booleana CERTIFICA (puntaje >= META_CERTIFICACION) viene de la vista
             # 2. Agrupamos y calculamos las métricas
-            stats_suc = df_f.groupby(col_suc).agg(
+            stats_suc = df_f.groupby(col_suc, observed=True).agg(
                 Cantidad_Inscriptos=(target, 'count'),
                 Puntaje_Promedio=(target, 'mean'),
                 Cant_Certificados=('CERTIFICA', 'sum') # Suma los True como 1
@@ -328,6 +236,28 @@ with t3:
             
             st.info(f"💡 **Estado de la Red:** Se han certificado **{total_cert}** de **{total_red}** clientes totales (**{porc_red:.1f}%** de efectividad).")
 
+            st.divider()
+
+            # --- BRECHAS POR ITEM: qué items frenan la certificación en cada sucursal ---
+            st.subheader("🧩 Brechas por Item y Sucursal")
+            brechas = brechas_items()
+            cats_b = [c for c in f_cat if c in brechas[col_cat].unique()]
+            if cats_b:
+                cat_b = st.selectbox("Categoría", cats_b, key="cat_brechas")
+                df_b = brechas[(brechas[col_cat] == cat_b) & brechas[col_suc].isin(f_suc)]
+                mapa = df_b.pivot(index=col_suc, columns='ITEM', values='TASA')
+                mapa = mapa[[i for i in ESCALAS[cat_b]["etiquetas"] if i in mapa.columns]]
+                fig_heat = px.imshow(
+                    mapa, text_auto=".0f", aspect="auto", zmin=0, zmax=100,
+                    color_continuous_scale="RdYlGn",
+                    labels=dict(x="Item", y="Sucursal", color="% Completo"),
+                    title=f"% de evaluaciones con el item completo (Óptimo) - {cat_b}")
+                st.plotly_chart(fig_heat, use_container_width=True)
+                with st.expander("Referencia de items"):
+                    st.markdown("\n".join(f"* {i}" for i in ESCALAS[cat_b]["items"]))
+            else:
+                st.info("No hay evaluaciones con detalle para las categorías seleccionadas.")
+
         else:
             st.info("No hay datos que coincidan con los filtros seleccionados.")
     else:
@@ -1,9 +1,10 @@
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
-import re
-from fpdf import FPDF
-from conexion import load_data, get_gspread_client, SHEET_ID, MAIN_WORKSHEET_NAME
+import reportes
+from evaluacion import EVALUATION_MAP, ESCALAS, matriz_puntajes, puntuar, tabla_resultados
+from vistas import evaluaciones, hechos_evaluaciones, registro_evaluacion, historial_cliente
+from busqueda import indice_evaluaciones, selector_busqueda
 
 # 1. CONFIGURACIÓN DE PÁGINA
 st.set_page_config(
@@ -12,144 +13,38 @@ st.set_page_config(
     page_icon="sf1.png"
 )
 
-# --- DICCIONARIO DE EVALUACIÓN COMPLETO ---
-EVALUATION_MAP = {
-    "Granos": {
-        "worksheet": "Granos",
-        "items": [
-            ("Item 1: Organización y estandarización de lotes.", 5),
-            ("Item 2: Línea de guiado.", 5),
-            ("Item 3: Organización altamente conectada.", 10),
-            ("Item 4: Uso de planificador de trabajo.", 15),
-            ("Item 5: Uso de Operations Center Mobile.", 10),
-            ("Item 6: JDLink.", 5),
-            ("Item 7: Envío remoto. Mezcla de tanque.", 10),
-            ("Item 8: % uso de autotrac en Tractor.", 10),
-            ("Item 9: % uso autotrac Cosecha.", 10),
-            ("Item 10: % uso autotrac Pulverización.", 10),
-            ("Item 11: Uso de funcionalidades avanzadas.", 15),
-            ("Item 12: Uso de tecnologías integradas.", 10),
-            ("Item 13: Señal de corrección StarFire.", 5),
-            ("Item 14: Paquete CSC.", 10),
-            ("Item 15: Vinculación de API.", 5),
-            ("Item 16: JDLink en otra marca.", 15),
-        ]
-    },
-    "Ganadería": {
-        "worksheet": "Ganadería",
-        "items": [
-            ("Item 1: Organización y estandarización de lotes.", 15),
-            ("Item 2: Digitalizar capa de siembra y mapa de picado.", 10),
-            ("Item 3: Uso de planificador de trabajo.", 20),
-            ("Item 4: Equipo registrados en el Centro de Operaciones.", 5),
-            ("Item 5: Operadores registrados en el Centro de Operaciones.", 5),
-            ("Item 6: Productos registrados en el Centro de Operaciones.", 5),
-            ("Item 7: Uso de Operations Center Mobile.", 10),
-            ("Item 8: JDLink activado en máquinas John Deere.", 10),
-            ("Item 9: Planes de mantenimiento en tractores.", 10),
-            ("Item 10: Mapeo de constituyentes.", 20),
-            ("Item 11: Conectividad alimentación.", 20),
-            ("Item 12: Generación de informes.", 10),
-            ("Item 13: Paquete contratado con el concesionario (CSC).", 10),
-        ]
-    },
-    "Cultivos de Alto Valor": {
-        "worksheet": "Cultivos de Alto Valor",
-        "items": [
-            ("Item 1: Organización y estandarización de lotes.", 15),
-            ("Item 2: Lineas de guiado.", 5),
-            ("Item 3: Tener al menos una labor digitalizada.", 10),
-            ("Item 4: Uso de planificador de trabajo para alguna operación.", 15),
-            ("Item 5: Uso del Operations Center Mobile.", 10),
-            ("Item 6: JDLink activado en máquinas John Deere.", 10),
-            ("Item 7: % uso de autotrac en Tractor.", 20),
-            ("Item 8: Implement Guidance.", 20),
-            ("Item 9: Señal de corrección StarFire.", 10),
-            ("Item 10: Paquete contratado con el concesionario (CSC).", 10),
-            ("Item 11: Equipos Registrados en Operations Center.", 5),
-            ("Item 12: Operadores registrados en Operations Center.", 5),
-            ("Item 13: Productos registrados en el Operations Center.", 5),
-            ("Item 14: Configuración de Alertas Personalizables.", 10),
-        ]
-    }
-}
-
-
 # --- FUNCIÓN GENERADORA DE PDF ---
+@st.cache_data(max_entries=256, show_spinner=False)
 def generar_pdf(nombre_cliente, categoria, score, score_max, tabla_data, recomendaciones):
-    pdf = FPDF()
-    pdf.add_page()
-
-    # Encabezado con Logos
-    try:
-        pdf.image("logo_conci.png", x=10, y=8, w=40)
-        pdf.image("logo_desafio.png", x=175, y=10, w=15)
-    except:
-        pass
-
-    pdf.ln(25)  # Espacio tras los logos
-
-    # Título Principal
-    pdf.set_font("Arial", 'B', 16)
-    pdf.set_text_color(40, 167, 69)
-    pdf.cell(190, 10, "Reporte SmartFarm", 0, 1, 'C')
-    pdf.ln(5)
-
-    # Datos Generales
-    pdf.set_text_color(0, 0, 0)
-    pdf.set_font("Arial", 'B', 12)
-    pdf.cell(95, 10, f"Cliente: {nombre_cliente}", 0, 0)
-    pdf.cell(95, 10, f"Categoria: {categoria}", 0, 1)
-
-    pdf.set_font("Arial", '', 12)
-    pdf.cell(95, 10, f"Puntaje Obtenido: {score:.0f} / {score_max:.0f}", 0, 0)
-    perc = (score / score_max * 100) if score_max > 0 else 0
-    pdf.cell(95, 10, f"Estado de Avance: {perc:.1f}%", 0, 1)
-    pdf.ln(10)
-
-    # Tabla de Resultados
-    pdf.set_font("Arial", 'B', 10)
-    pdf.set_fill_color(230, 230, 230)
-    pdf.cell(130, 10, "Punto Evaluado", 1, 0, 'C', True)
-    pdf.cell(30, 10, "Puntaje", 1, 0, 'C', True)
-    pdf.cell(30, 10, "Estado", 1, 1, 'C', True)
-
-    pdf.set_font("Arial", '', 9)
-    for row in tabla_data:
-        y_before = pdf.get_y()
-        pdf.multi_cell(130, 8, row["Punto Evaluado"], 1)
-        y_after = pdf.get_y()
-        h = y_after - y_before
-
-        pdf.set_xy(140, y_before)
-        pdf.cell(30, h, row["Puntaje"], 1, 0, 'C')
-        txt_estado = row["Estado"].replace("✅ ", "").replace("⚠️ ", "").replace("❌ ", "")
-        pdf.cell(30, h, txt_estado, 1, 1, 'C')
-
-    # Recomendaciones Finales
-    if recomendaciones:
-        pdf.ln(10)
-        pdf.set_font("Arial", 'B', 12)
-        pdf.set_text_color(40, 167, 69)
-        pdf.cell(190, 10, "Plan de Accion y Recomendaciones:", 0, 1, 'L')
-        pdf.set_text_color(0, 0, 0)
-        pdf.set_font("Arial", '', 11)
-        pdf.multi_cell(190, 7, recomendaciones, 0, 'L')
-
-    return pdf.output(dest='S').encode('latin-1', 'ignore')
+    return reportes.generar_pdf(nombre_cliente, categoria, score, score_max, tabla_data, recomendaciones)
 
 
 # --- FUNCIONES DE CARGA ---
-def get_record_detailed(selected_id, selected_timestamp, category):
-    try:
-        ws_name = EVALUATION_MAP[category]["worksheet"]
-        df_cat = load_data(ws_name)
-        if df_cat.empty: return None
-        record = df_cat[(df_cat['ID CLIENTE'].astype(str) == str(selected_id)) & (
-                    df_cat['FECHA Y HORA'].astype(str) == str(selected_timestamp))]
-        return record.iloc[0] if not record.empty else None
-    except:
-        return None
+def armar_trabajos(df_sel):
+    """Argumentos de generar_pdf para cada evaluación de df_sel (se puntúa cada categoría de una vez)."""
+    tabla = hechos_evaluaciones()
+    if tabla.empty:
+        return []
+    claves = pd.MultiIndex.from_arrays([df_sel['ID CLIENTE'].astype(str), df_sel['FECHA Y HORA']])
+    sel = tabla[tabla.index.isin(claves) & tabla['CON DETALLE']]
+    trabajos = []
+    for cat, df_c in sel.groupby('CATEGORÍA DE EVALUACIÓN', observed=True):
+        if cat not in ESCALAS:
+            continue
+        matriz = matriz_puntajes(cat, df_c)
+        estados = puntuar(cat, matriz)["estados"]
+        filas = zip(df_c.index, df_c['CLIENTE'], df_c['PUNTAJE TOTAL SMARTFARM'], matriz, estados)
+        for (id_cliente, fecha), cliente, score, puntajes, est in filas:
+            trabajos.append({
+                "archivo": reportes.nombre_archivo_pdf(cliente, id_cliente, fecha),
+                "nombre_cliente": cliente,
+                "categoria": cat,
+                "score": score,
+                "score_max": ESCALAS[cat]["maximo_total"],
+                "tabla_data": tabla_resultados(cat, puntajes, est),
+                "recomendaciones": "",
+            })
+    return trabajos
 
 
 # --- INTERFAZ STREAMLIT ---
@@ -162,31 +57,30 @@ with col_logo2:
 
 st.title("📋 Reporte Individual de Cliente")
 
-main_df = load_data(MAIN_WORKSHEET_NAME)
+main_df = evaluaciones()
 
 if not main_df.empty:
-    main_df['Selector'] = main_df['ID CLIENTE'].astype(str) + " - " + main_df['CLIENTE'].astype(str) + " (" + main_df[
-        'FECHA Y HORA'].astype(str) + ")"
-    opciones = ["Seleccione un registro..."] + main_df['Selector'].tolist()
-    seleccion = st.selectbox("🔍 Buscar Evaluación Guardada:", opciones)
+    # Clave (ID CLIENTE, FECHA Y HORA) de la evaluación elegida
+    seleccion = selector_busqueda(indice_evaluaciones(), "Buscar Evaluación Guardada:", key="reporte")
 else:
     st.warning("No hay datos cargados.")
     st.stop()
 
-if seleccion != "Seleccione un registro...":
+if seleccion is not None:
     try:
-        id_sel = seleccion.split(" - ")[0]
-        ts_sel = re.search(r'\((.*?)\)', seleccion).group(1)
+        id_sel, ts_sel = seleccion
 
-        datos_p = \
-        main_df[(main_df['ID CLIENTE'].astype(str) == id_sel) & (main_df['FECHA Y HORA'].astype(str) == ts_sel)].iloc[0]
-        cat_sel = datos_p['CATEGORÍA DE EVALUACIÓN']
-        detalle = get_record_detailed(id_sel, ts_sel, cat_sel)
+        # Hoja 1 + items de la categoría en una sola búsqueda por clave
+        detalle = registro_evaluacion(id_sel, ts_sel)
 
         if detalle is not None:
-            items_cfg = EVALUATION_MAP[cat_sel]["items"]
-            score_obt = pd.to_numeric(datos_p['PUNTAJE TOTAL SMARTFARM'], errors='coerce')
-            score_max = sum(item[1] for item in items_cfg)
+            datos_p = detalle
+            cat_sel = datos_p['CATEGORÍA DE EVALUACIÓN']
+            escala = ESCALAS[cat_sel]
+            matriz = matriz_puntajes(cat_sel, detalle)
+            resultado = puntuar(cat_sel, matriz)
+            score_obt = datos_p['PUNTAJE TOTAL SMARTFARM']
+            score_max = escala["maximo_total"]
 
             # KPIs
             st.divider()
@@ -195,13 +89,18 @@ if seleccion != "Seleccione un registro...":
             k2.metric("Potencial Máximo", f"{score_max:.0f} pts")
             k3.metric("Estado de Avance", f"{(score_obt / score_max * 100):.1f}%")
 
+            # Evolución del cliente si tiene más de una evaluación
+            hist = historial_cliente(id_sel)
+            if len(hist) > 1:
+                st.subheader("📈 Evolución del Puntaje")
+                fig_hist = go.Figure(data=go.Scatter(x=hist['FECHA Y HORA'], y=hist['PUNTAJE TOTAL SMARTFARM'],
+                                                     mode='lines+markers', line_color='#28a745'))
+                st.plotly_chart(fig_hist, use_container_width=True)
+
             # Radar Chart
             st.subheader("📊 Gráfico de Fortalezas")
-            labels = [item[0].split(":")[0] for item in items_cfg]
-            valores = []
-            for item in items_cfg:
-                val = pd.to_numeric(detalle.get(item[0].upper(), 0), errors='coerce')
-                valores.append((val / item[1] * 100) if item[1] > 0 else 0)
+            labels = escala["etiquetas"]
+            valores = resultado["porcentajes_items"][0].tolist()
 
             fig = go.Figure(data=go.Scatterpolar(r=valores + [valores[0]], theta=labels + [labels[0]], fill='toself',
                                                  line_color='#28a745'))
@@ -210,11 +109,7 @@ if seleccion != "Seleccione un registro...":
 
             # Tabla de Recomendaciones
             st.subheader("📝 Detalle de Evaluación")
-            tabla_data = []
-            for item in items_cfg:
-                v = pd.to_numeric(detalle.get(item[0].upper(), 0), errors='coerce')
-                est = "✅ Óptimo" if v == item[1] else "⚠️ Mejorable" if v > 0 else "❌ Pendiente"
-                tabla_data.append({"Punto Evaluado": item[0], "Puntaje": f"{v:.0f}/{item[1]}", "Estado": est})
+            tabla_data = tabla_resultados(cat_sel, matriz[0], resultado["estados"][0])
 
             st.table(pd.DataFrame(tabla_data))
 
@@ -224,18 +119,59 @@ if seleccion != "Seleccione un registro...":
                                     placeholder="Ej: Recomendamos instalar JDLink en el tractor principal para mejorar la conectividad...",
                                     height=150)
 
-            # Botón de Descarga
+            # Botón de Descarga: el PDF se arma solo cuando se pide (escribir en el plan de
+            # acción no lo regenera) y queda memoizado por cliente, puntajes y texto
             st.divider()
-            pdf_bytes = generar_pdf(datos_p['CLIENTE'], cat_sel, score_obt, score_max, tabla_data, txt_reco)
+            clave_pdf = (id_sel, ts_sel, txt_reco)
+            if st.button("📄 Preparar Reporte PDF", use_container_width=True):
+                st.session_state["pdf_preparado"] = clave_pdf
+
+            if st.session_state.get("pdf_preparado") == clave_pdf:
+                pdf_bytes = generar_pdf(datos_p['CLIENTE'], cat_sel, score_obt, score_max, tabla_data, txt_reco)
 
-            st.download_button(
-                label="📥 Descargar Reporte Completo en PDF",
-                data=pdf_bytes,
-                file_name=f"Reporte_SmartFarm_{datos_p['CLIENTE']}.pdf",
-                mime="application/pdf",
-                use_container_width=True
-            )
+                st.download_button(
+                    label="📥 Descargar Reporte Completo en PDF",
+                    data=pdf_bytes,
+                    file_name=f"Reporte_SmartFarm_{datos_p['CLIENTE']}.pdf",
+                    mime="application/pdf",
+                    use_container_width=True
+                )
 
     except Exception as e:
         st.error(f"Error al procesar el reporte: {e}")
 
+# --- REPORTES MASIVOS ---
+st.divider()
+with st.expander("📦 Generación Masiva de Reportes (ZIP)"):
+    c1, c2 = st.columns(2)
+    f_suc = c1.multiselect("Sucursales", sorted(main_df['SUCURSAL'].astype(str).unique()))
+    f_cat = c2.multiselect("Categorías", list(EVALUATION_MAP.keys()))
+    solo_ultima = st.checkbox("Solo la última evaluación de cada cliente", value=True)
+
+    df_lote = main_df
+    if f_suc:
+        df_lote = df_lote[df_lote['SUCURSAL'].astype(str).isin(f_suc)]
+    if f_cat:
+        df_lote = df_lote[df_lote['CATEGORÍA DE EVALUACIÓN'].isin(f_cat)]
+    if solo_ultima:
+        df_lote = df_lote.sort_values('FECHA Y HORA').drop_duplicates('ID CLIENTE', keep='last')
+    st.caption(f"{len(df_lote)} evaluaciones seleccionadas.")
+
+    # El ZIP se guarda junto con los filtros que lo generaron: si cambian ya no se ofrece
+    filtros = (tuple(f_suc), tuple(f_cat), solo_ultima)
+    if st.button("⚙️ Generar Reportes", disabled=df_lote.empty):
+        trabajos = armar_trabajos(df_lote)
+        barra = st.progress(0.0, text="Generando reportes...")
+        st.session_state["zip_reportes"] = (filtros, reportes.generar_reportes_zip(
+            trabajos, al_avanzar=lambda hechos, total: barra.progress(hechos / total, text=f"{hechos}/{total} reportes")))
+        barra.empty()
+
+    zip_generado = st.session_state.get("zip_reportes")
+    if zip_generado and zip_generado[0] == filtros:
+        st.download_button(
+            label="📥 Descargar ZIP de Reportes",
+            data=zip_generado[1],
+            file_name="Reportes_SmartFarm.zip",
+            mime="application/zip",
+            use_container_width=True
+        )
@@ -1,8 +1,10 @@
 import streamlit as st
-import pandas as pd
 from datetime import datetime
 import plotly.express as px
-from conexion import load_data, get_gspread_client, SHEET_ID, MAIN_WORKSHEET_NAME
+from conexion import agregar_registro, fila_registro, columnas_hoja, LoteEscritura
+from vistas import evaluaciones, evaluaciones_actuales, proyectos
+from busqueda import indice_clientes, indice_proyectos, selector_busqueda
+from analitica import consultar, RESUMEN_SUCURSALES_SQL
 
 # 1. Configuración de página
 st.set_page_config(page_title="Gestión de Proyectos AA - Conci", layout="wide", page_icon="sf1.png")
@@ -23,24 +25,17 @@ COLOR_MAP = {
 }
 
 
-def normalizar_df(df):
-    """Limpia encabezados: quita espacios y pasa a MAYÚSCULAS."""
-    if df is not None and not df.empty:
-        df.columns = [str(c).strip().upper() for c in df.columns]
-    return df
-
-
 st.title("🚜 Proyectos Agronomy Analyzer")
 tab1, tab2, tab3 = st.tabs(["➕ Registro", "✏️ Edición", "📊 Dashboard"])
 
 # --- TAB 1: REGISTRO ---
 with tab1:
-    main_df = normalizar_df(load_data(MAIN_WORKSHEET_NAME))
+    main_df = evaluaciones_actuales()
     if not main_df.empty:
-        main_df['SELECTOR'] = main_df['ID CLIENTE'].astype(str) + " - " + main_df['CLIENTE'].astype(str)
-        cli_sel = st.selectbox("Seleccionar Cliente:", [""] + main_df['SELECTOR'].unique().tolist())
+        indice = indice_clientes()
+        cli_sel = selector_busqueda(indice, "Seleccionar Cliente:", key="proy_cliente")
 
-        if cli_sel:
+        if cli_sel is not None:
             with st.form("f_reg"):
                 c1, c2 = st.columns(2)
                 tipo = c1.text_input("Tipo de Proyecto")
@@ -55,7 +50,7 @@ with tab1:
                                                       step=0.5)
 
                 if st.form_submit_button("Guardar Proyecto"):
-                    info = main_df[main_df['SELECTOR'] == cli_sel].iloc[0]
+                    info = indice.registro(cli_sel)
                     fila = [
                         str(datetime.now().strftime("%d/%m/%Y %H:%M:%S")),
                         str(info['ID CLIENTE']), str(info['CLIENTE']), str(info['SUCURSAL']),
@@ -65,26 +60,24 @@ with tab1:
                         str(vals[STAGES_COLS[2][0]]), float(vals[STAGES_COLS[2][1]])
                     ]
                     try:
-                        client = get_gspread_client()
-                        ws = client.open_by_key(SHEET_ID).worksheet(PROJECTS_WORKSHEET_NAME)
-                        ws.append_row(fila, value_input_option='USER_ENTERED')
+                        agregar_registro(PROJECTS_WORKSHEET_NAME, fila, value_input_option='USER_ENTERED')
                         st.success("¡Proyecto Guardado!")
-                        st.cache_data.clear()
                         st.rerun()
                     except Exception as e:
                         st.error(f"Error al guardar: {e}")
 
 # --- TAB 2: EDICIÓN ---
 with tab2:
-    p_df = normalizar_df(load_data(PROJECTS_WORKSHEET_NAME))
+    p_df = proyectos()
     if not p_df.empty:
         if 'NOMBRE' in p_df.columns:
-            p_df['SELECTOR_E'] = p_df['CLIENTE'].astype(str) + " | " + p_df['NOMBRE'].astype(str)
-            sel_e = st.selectbox("Proyecto a editar:", [""] + p_df['SELECTOR_E'].tolist())
+            # La clave de cada resultado es el ID REGISTRO del proyecto
+            indice = indice_proyectos()
+            id_proyecto = selector_busqueda(indice, "Proyecto a editar:", key="proy_edit",
+                                            placeholder="ID, cliente, proyecto o sucursal...")
 
-            if sel_e:
-                idx = p_df[p_df['SELECTOR_E'] == sel_e].index[0]
-                row = p_df.iloc[idx]
+            row = indice.registro(id_proyecto) if id_proyecto is not None else None
+            if row is not None:
                 with st.form("f_edit"):
                     st.subheader(f"Editando: {row['NOMBRE']}")
                     new_vals = {}
@@ -98,40 +91,35 @@ with tab2:
 
                     if st.form_submit_button("Actualizar"):
                         try:
-                            ws = get_gspread_client().open_by_key(SHEET_ID).worksheet(PROJECTS_WORKSHEET_NAME)
-                            row_num = int(idx) + 2
-                            col_p = 9
+                            lote = LoteEscritura()
+                            # Fila actual del proyecto según su ID (verificada contra la hoja)
+                            row_num = fila_registro(PROJECTS_WORKSHEET_NAME, id_proyecto)
+                            # Columnas de cada etapa según los encabezados de la hoja
+                            cols = columnas_hoja(PROJECTS_WORKSHEET_NAME)
                             for st_col, hr_col in STAGES_COLS:
-                                ws.update_cell(row_num, col_p, str(new_vals[st_col]))
-                                ws.update_cell(row_num, col_p + 1, float(new_vals[hr_col]))
-                                col_p += 2
+                                lote.actualizar(PROJECTS_WORKSHEET_NAME, row_num, cols[st_col], str(new_vals[st_col]))
+                                lote.actualizar(PROJECTS_WORKSHEET_NAME, row_num, cols[hr_col], float(new_vals[hr_col]))
+                            lote.enviar()
                             st.success("Actualizado");
-                            st.cache_data.clear();
                             st.rerun()
                         except Exception as e:
                             st.error(f"Error al actualizar: {e}")
 
 # --- TAB 3: DASHBOARD ---
 with tab3:
-    p_df = normalizar_df(load_data(PROJECTS_WORKSHEET_NAME))
-    c_df = normalizar_df(load_data(MAIN_WORKSHEET_NAME))
+    p_df = proyectos()
+    c_df = evaluaciones()
 
     if not p_df.empty:
         # --- FILTRO POR SUCURSAL ---
         sucursales = ["Todas"] + sorted(p_df['SUCURSAL'].unique().tolist())
         suc_sel = st.selectbox("📍 Filtrar por Sucursal:", sucursales)
 
-        # Aplicar filtro
-        df_filtered = p_df.copy()
+        # Aplicar filtro (TOTAL_HS ya viene calculado en la vista)
+        df_filtered = p_df
         if suc_sel != "Todas":
             df_filtered = df_filtered[df_filtered['SUCURSAL'] == suc_sel]
 
-        # Convertir horas a números
-        hr_cols = [s[1] for s in STAGES_COLS]
-        for c in hr_cols:
-            df_filtered[c] = pd.to_numeric(df_filtered[c], errors='coerce').fillna(0)
-        df_filtered['TOTAL_HS'] = df_filtered[hr_cols].sum(axis=1)
-
         st.subheader(f"📊 Resumen General: {suc_sel}")
 
         # --- EMBUDO DE PROYECTOS (Métricas principales) ---
@@ -182,17 +170,8 @@ with tab3:
         st.divider()
         st.subheader("🏢 Análisis Comparativo por Sucursal")
         if not c_df.empty:
-            suc_c = c_df.groupby('SUCURSAL')['ID CLIENTE'].nunique().reset_index(name='REGISTRADOS')
-            # Para el gráfico final usamos p_df (sin el filtro de arriba para poder comparar)
-            p_df_calc = p_df.copy()
-            for c in hr_cols: p_df_calc[c] = pd.to_numeric(p_df_calc[c], errors='coerce').fillna(0)
-            p_df_calc['TOTAL_HS'] = p_df_calc[hr_cols].sum(axis=1)
-
-            suc_p = p_df_calc.groupby('SUCURSAL').agg(
-                PROYECTOS=('CLIENTE', 'count'),
-                HORAS=('TOTAL_HS', 'sum')
-            ).reset_index()
-            resumen = pd.merge(suc_c, suc_p, on='SUCURSAL', how='left').fillna(0)
+            # Para el gráfico final usamos todos los proyectos (sin el filtro de arriba para poder comparar)
+            resumen = consultar(RESUMEN_SUCURSALES_SQL)
             st.dataframe(resumen, use_container_width=True, hide_index=True)
             st.plotly_chart(px.bar(resumen, x='SUCURSAL', y='HORAS', title="Esfuerzo Acumulado por Sucursal",
                                    color_discrete_sequence=['#28a745']), use_container_width=True)
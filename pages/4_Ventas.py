@@ -1,8 +1,10 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
 from datetime import datetime
-from conexion import load_data, get_gspread_client, SHEET_ID, MAIN_WORKSHEET_NAME
+from conexion import load_data, agregar_registro, fila_registro, columnas_hoja, LoteEscritura, COL_ID_REGISTRO
+from vistas import evaluaciones_actuales
+from busqueda import indice_clientes, indice_ventas, selector_busqueda
+from analitica import consultar, KPIS_VENTAS_SQL
 
 # 1. CONFIGURACIÓN INICIAL
 st.set_page_config(layout="wide", page_title="Gestión de Ventas SmartFarm", page_icon="sf1.png")
@@ -21,33 +23,23 @@ COL_MONTO = "MONTO"
 COL_DETALLE = "DETALLE DE LA OPORTUNIDAD/VENTA"
 
 
-def normalizar_df(df):
-    """Limpia encabezados: quita espacios y pasa a MAYÚSCULAS."""
-    if df is not None and not df.empty:
-        df.columns = [str(c).strip().upper() for c in df.columns]
-        if COL_MONTO in df.columns:
-            df[COL_MONTO] = pd.to_numeric(df[COL_MONTO], errors='coerce').fillna(0.0)
-    return df
-
-
 st.title("💰 Gestión de Oportunidades y Ventas SmartFarm")
 
-# Carga de datos
-main_df = normalizar_df(load_data(MAIN_WORKSHEET_NAME))
-sales_df = normalizar_df(load_data(SALES_WORKSHEET_NAME))
+# Carga de datos (vistas compartidas: encabezados normalizados y MONTO numérico)
+main_df = evaluaciones_actuales()
+sales_df = load_data(SALES_WORKSHEET_NAME)
 
 tab_reg, tab_manage, tab_analysis = st.tabs(["➕ Registrar Venta", "✏️ Gestionar Estados", "📊 Análisis"])
 
 # --- TAB 1: REGISTRO ---
 with tab_reg:
     if not main_df.empty:
-        main_df['SELECTOR'] = main_df['ID CLIENTE'].astype(str) + " - " + main_df['CLIENTE'].astype(str)
-        client_options = ["Selecciona un cliente"] + main_df['SELECTOR'].unique().tolist()
+        # La búsqueda va fuera del formulario para que filtre mientras se escribe
+        indice = indice_clientes()
+        cliente_sel = selector_busqueda(indice, "Cliente:", key="venta_cliente")
 
         with st.form("reg_form", clear_on_submit=True):
-            col1, col2 = st.columns(2)
-            cliente_sel = col1.selectbox("Cliente:", client_options)
-            tipo = col2.selectbox("Tipo de Venta:", TIPO_VENTA_OPTIONS)
+            tipo = st.selectbox("Tipo de Venta:", TIPO_VENTA_OPTIONS)
 
             col3, col4 = st.columns(2)
             monto = col3.number_input("Monto Estimado (USD):", min_value=0.0, step=100.0)
@@ -56,21 +48,18 @@ with tab_reg:
             detalle = st.text_area("Detalle de la oportunidad:")
 
             if st.form_submit_button("Registrar en Embudo"):
-                if cliente_sel == "Selecciona un cliente":
+                if cliente_sel is None:
                     st.error("Por favor selecciona un cliente.")
                 else:
-                    partes = cliente_sel.split(" - ")
+                    info = indice.registro(cliente_sel)
                     # Fila ordenada: Fecha, ID, Cliente, Tipo, Estado, Monto, Detalle
                     nueva_fila = [
                         datetime.now().strftime("%d/%m/%Y"),
-                        partes[0], partes[1], tipo, estado, monto, detalle
+                        str(info[COL_ID]), str(info[COL_CLIENTE]), tipo, estado, monto, detalle
                     ]
                     try:
-                        client = get_gspread_client()
-                        ws = client.open_by_key(SHEET_ID).worksheet(SALES_WORKSHEET_NAME)
-                        ws.append_row(nueva_fila)
+                        agregar_registro(SALES_WORKSHEET_NAME, nueva_fila)
                         st.success("¡Venta registrada con éxito!")
-                        st.cache_data.clear()
                         st.rerun()
                     except Exception as e:
                         st.error(f"Error al guardar: {e}")
@@ -78,16 +67,13 @@ with tab_reg:
 # --- TAB 2: GESTIONAR ESTADOS (EDICIÓN) ---
 with tab_manage:
     if not sales_df.empty:
-        # Selector para identificar la venta
-        sales_df['SELECTOR_EDIT'] = sales_df[COL_CLIENTE].astype(str) + " | " + \
-                                    sales_df[COL_TIPO].astype(str) + " | $" + \
-                                    sales_df[COL_MONTO].astype(str)
-
-        venta_sel = st.selectbox("Seleccione la venta para actualizar:", [""] + sales_df['SELECTOR_EDIT'].tolist())
+        # La clave de cada resultado es el ID REGISTRO de la venta
+        indice = indice_ventas()
+        id_venta = selector_busqueda(indice, "Seleccione la venta para actualizar:", key="venta_edit",
+                                     placeholder="ID, cliente, tipo o monto...")
 
-        if venta_sel:
-            idx = sales_df[sales_df['SELECTOR_EDIT'] == venta_sel].index[0]
-            row = sales_df.iloc[idx]
+        row = indice.registro(id_venta) if id_venta is not None else None
+        if row is not None:
 
             with st.form("form_edit_venta"):
                 st.info(f"Actualizando oportunidad de: **{row[COL_CLIENTE]}**")
@@ -110,18 +96,19 @@ with tab_manage:
 
                 if st.form_submit_button("Guardar Cambios"):
                     try:
-                        client = get_gspread_client()
-                        ws = client.open_by_key(SHEET_ID).worksheet(SALES_WORKSHEET_NAME)
-                        row_num = int(idx) + 2
-
-                        # Actualización de celdas (D=4, E=5, F=6, G=7)
-                        ws.update_cell(row_num, 4, nuevo_tipo)
-                        ws.update_cell(row_num, 5, nuevo_estado)
-                        ws.update_cell(row_num, 6, nuevo_monto)
-                        ws.update_cell(row_num, 7, nuevo_detalle)
+                        lote = LoteEscritura()
+                        # Fila actual de la venta según su ID (verificada contra la hoja)
+                        row_num = fila_registro(SALES_WORKSHEET_NAME, id_venta)
+
+                        # Actualización de celdas en un solo request; columnas según los encabezados
+                        cols = columnas_hoja(SALES_WORKSHEET_NAME)
+                        lote.actualizar(SALES_WORKSHEET_NAME, row_num, cols[COL_TIPO], nuevo_tipo)
+                        lote.actualizar(SALES_WORKSHEET_NAME, row_num, cols[COL_ESTADO], nuevo_estado)
+                        lote.actualizar(SALES_WORKSHEET_NAME, row_num, cols[COL_MONTO], nuevo_monto)
+                        lote.actualizar(SALES_WORKSHEET_NAME, row_num, cols[COL_DETALLE], nuevo_detalle)
+                        lote.enviar()
 
                         st.success("¡Venta actualizada!")
-                        st.cache_data.clear()
                         st.rerun()
                     except Exception as e:
                         st.error(f"Error al conectar con Google Sheets: {e}")
@@ -132,13 +119,10 @@ with tab_manage:
 with tab_analysis:
     if not sales_df.empty:
         # Cálculos Robustos (Insensibles a mayúsculas en el contenido)
-        total_pipeline = sales_df[COL_MONTO].sum()
-
-        # Filtro de ganadas comparando en mayúsculas
-        ganadas_df = sales_df[sales_df[COL_ESTADO].astype(str).str.upper() == 'CERRADO']
-        monto_ganado = ganadas_df[COL_MONTO].sum()
-
-        tasa_conversion = (len(ganadas_df) / len(sales_df)) * 100 if len(sales_df) > 0 else 0
+        kpis = consultar(KPIS_VENTAS_SQL).iloc[0]
+        total_pipeline = kpis["PIPELINE"]
+        monto_ganado = kpis["GANADO"]
+        tasa_conversion = kpis["GANADAS"] / kpis["TOTAL"] * 100 if kpis["TOTAL"] > 0 else 0
 
         # KPIs
         k1, k2, k3 = st.columns(3)
@@ -153,8 +137,7 @@ with tab_analysis:
 
         with col_g1:
             # Normalizamos temporalmente para el gráfico para que el color_map coincida
-            plot_df = sales_df.copy()
-            plot_df[COL_ESTADO] = plot_df[COL_ESTADO].astype(str).str.upper()
+            plot_df = sales_df.assign(**{COL_ESTADO: sales_df[COL_ESTADO].astype(str).str.upper()})
 
             fig_pie = px.pie(
                 plot_df, names=COL_ESTADO, values=COL_MONTO,
@@ -172,7 +155,7 @@ with tab_analysis:
             st.plotly_chart(fig_bar, use_container_width=True)
 
         st.subheader("📋 Listado Detallado")
-        st.dataframe(sales_df, use_container_width=True, hide_index=True)
+        st.dataframe(sales_df.drop(columns=COL_ID_REGISTRO, errors='ignore'), use_container_width=True, hide_index=True)
     else:
         st.info("No hay datos de ventas para analizar.")
 
@@ -0,0 +1,76 @@
+import streamlit as st
+import plotly.express as px
+from evaluacion import EVALUATION_CATEGORIES
+from tendencias import rollup_mensual, certificacion_trimestral, tiempo_certificacion
+from vistas import evaluaciones_actuales, META_CERTIFICACION
+
+# 1. Configuración de página
+st.set_page_config(page_title="Tendencias SmartFarm - Conci", layout="wide", page_icon="sf1.png")
+
+st.title("📈 Tendencias de Adopción SmartFarm")
+
+# Los agregados se mantienen precalculados (ver tendencias.py); acá solo se filtran y grafican
+mensual = rollup_mensual()
+
+if mensual.empty:
+    st.info("Registre evaluaciones para ver la evolución en el tiempo.")
+    st.stop()
+
+# --- FILTROS ---
+c1, c2 = st.columns(2)
+sucursales = sorted(mensual['SUCURSAL'].unique())
+f_suc = c1.multiselect("Sucursales", sucursales, default=sucursales)
+f_cat = c2.multiselect("Categorías", EVALUATION_CATEGORIES, default=EVALUATION_CATEGORIES)
+sel = mensual[mensual['SUCURSAL'].isin(f_suc) & mensual['CATEGORÍA DE EVALUACIÓN'].isin(f_cat)]
+
+if sel.empty:
+    st.info("No hay evaluaciones que coincidan con los filtros seleccionados.")
+    st.stop()
+
+# --- PUNTAJE PROMEDIO MENSUAL POR SUCURSAL ---
+st.subheader("📊 Puntaje Promedio Mensual por Sucursal")
+por_mes = sel.groupby(['MES', 'SUCURSAL'], as_index=False)[['PUNTAJE_SUMA', 'EVALUACIONES']].sum()
+por_mes['PUNTAJE_PROMEDIO'] = por_mes['PUNTAJE_SUMA'] / por_mes['EVALUACIONES']
+st.plotly_chart(px.line(por_mes, x='MES', y='PUNTAJE_PROMEDIO', color='SUCURSAL', markers=True,
+                        labels={'MES': 'Mes', 'PUNTAJE_PROMEDIO': 'Puntaje Promedio'}),
+                use_container_width=True)
+
+st.divider()
+
+# --- CERTIFICACIÓN POR TRIMESTRE ---
+st.subheader(f"🏅 Tasa de Certificación por Trimestre (>= {META_CERTIFICACION} pts)")
+col_g1, col_g2 = st.columns(2)
+with col_g1:
+    red = certificacion_trimestral(sel)
+    st.plotly_chart(px.bar(red, x='TRIMESTRE', y='TASA', text_auto='.1f', title="Red completa",
+                           color_discrete_sequence=['#28a745'], labels={'TASA': '% Certificación'}),
+                    use_container_width=True)
+with col_g2:
+    por_suc = certificacion_trimestral(sel, por='SUCURSAL')
+    st.plotly_chart(px.line(por_suc, x='TRIMESTRE', y='TASA', color='SUCURSAL', markers=True,
+                            title="Por sucursal", labels={'TASA': '% Certificación'}),
+                    use_container_width=True)
+
+st.divider()
+
+# --- TIEMPO HASTA LA CERTIFICACIÓN ---
+st.subheader("⏱️ Tiempo hasta la Certificación")
+clientes = evaluaciones_actuales()[['ID CLIENTE', 'CLIENTE', 'SUCURSAL', 'CATEGORÍA DE EVALUACIÓN']]
+tiempos = tiempo_certificacion().merge(clientes.astype({'ID CLIENTE': str}), on='ID CLIENTE', how='left')
+tiempos = tiempos[tiempos['SUCURSAL'].isin(f_suc) & tiempos['CATEGORÍA DE EVALUACIÓN'].isin(f_cat)]
+certificados = tiempos.dropna(subset=['DIAS'])
+
+m1, m2, m3 = st.columns(3)
+m1.metric("Clientes Evaluados", len(tiempos))
+m2.metric("Clientes Certificados", len(certificados),
+          f"{len(certificados) / len(tiempos) * 100:.1f}%" if len(tiempos) else None)
+m3.metric("Mediana de Días", f"{certificados['DIAS'].median():.0f}" if not certificados.empty else "-")
+
+if not certificados.empty:
+    st.plotly_chart(px.histogram(certificados, x='DIAS', nbins=20, color_discrete_sequence=['#28a745'],
+                                 title="Días desde la primera evaluación hasta certificar",
+                                 labels={'DIAS': 'Días'}),
+                    use_container_width=True)
+    st.dataframe(
+        certificados.sort_values('DIAS')[['CLIENTE', 'SUCURSAL', 'PRIMERA', 'CERTIFICACION', 'DIAS']],
+        use_container_width=True, hide_index=True)
@@ -0,0 +1,334 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+from gspread.utils import numericise
+
+# --- UBICACIÓN DE LA RÉPLICA ---
+REPLICA_DIR = os.getenv("SMARTFARM_REPLICA_DIR",
+                        os.path.join(os.path.dirname(os.path.abspath(__file__)), ".replica"))
+REPLICA_PATH = os.path.join(REPLICA_DIR, "smartfarm.db")
+# Se incrementa cuando cambian las tablas; la réplica es descartable y se vuelve a bajar
+ESQUEMA_VERSION = 5
+
+
+def _normalizar(fila):
+    """Pasa las celdas a texto y quita las vacías del final (la API no las devuelve)."""
+    fila = [str(c) for c in fila]
+    while fila and fila[-1] == "":
+        fila.pop()
+    return fila
+
+
+def texto_celda(valor):
+    """Texto con el que la hoja devuelve un valor escrito por la app (12.0 se lee como '12')."""
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return "" if valor is None else str(valor)
+
+
+def _huella(previa, filas):
+    """Huella encadenada: agregar filas y bajar la hoja completa dan el mismo resultado."""
+    h = previa
+    for f in filas:
+        h = hashlib.sha1((h + json.dumps(f, ensure_ascii=False)).encode("utf-8")).hexdigest()
+    return h
+
+
+def clave_registro(valores):
+    """Clave de búsqueda de un registro; numericise iguala '0123' de la hoja con 123 del DataFrame."""
+    return "\x1f".join(str(numericise(str(v))) for v in valores)
+
+
+class ReplicaLocal:
+    """Copia local (SQLite) de las hojas de Google Sheets que usa la app."""
+
+    def __init__(self, path=REPLICA_PATH, claves=None):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.path = path
+        # hoja -> columnas que identifican un registro, para el índice clave -> fila
+        self.claves = claves or {}
+        self._lock = threading.Lock()
+        self._con = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.execute("PRAGMA synchronous=NORMAL")
+        if self._con.execute("PRAGMA user_version").fetchone()[0] != ESQUEMA_VERSION:
+            self._con.executescript(f"""
+                DROP TABLE IF EXISTS hojas;
+                DROP TABLE IF EXISTS filas;
+                DROP TABLE IF EXISTS claves;
+                PRAGMA user_version = {ESQUEMA_VERSION};
+            """)
+        self._con.executescript("""
+            CREATE TABLE IF NOT EXISTS hojas (
+                nombre TEXT PRIMARY KEY,
+                encabezados TEXT NOT NULL,
+                filas INTEGER NOT NULL,
+                ancho INTEGER NOT NULL,
+                huella TEXT NOT NULL,
+                version INTEGER NOT NULL,
+                generacion INTEGER NOT NULL,
+                sincronizado REAL NOT NULL,
+                reconciliado REAL NOT NULL,
+                pendiente REAL NOT NULL DEFAULT 0
+            );
+            CREATE TABLE IF NOT EXISTS filas (
+                hoja TEXT NOT NULL,
+                fila INTEGER NOT NULL,
+                valores TEXT NOT NULL,
+                PRIMARY KEY (hoja, fila)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS claves (
+                hoja TEXT NOT NULL,
+                clave TEXT NOT NULL,
+                fila INTEGER NOT NULL,
+                PRIMARY KEY (hoja, clave)
+            ) WITHOUT ROWID;
+        """)
+
+    def _filas_clave(self, hoja, encabezados, filas, primera):
+        """Pares (clave, fila) de las filas dadas; `primera` es el número de fila de filas[0]."""
+        columnas = self.claves.get(hoja)
+        if not columnas:
+            return []
+        normalizados = [str(h).strip().upper() for h in encabezados]
+        if any(c not in normalizados for c in columnas):
+            return []
+        pos = [normalizados.index(c) for c in columnas]
+        return [
+            (hoja, clave_registro([f[p] if p < len(f) else "" for p in pos]), primera + i)
+            for i, f in enumerate(filas)
+        ]
+
+    def estado(self, hoja):
+        """Metadatos de sincronización de la hoja, o None si nunca se descargó.
+
+        `version` cambia con cualquier cambio de contenido; `generacion` solo cuando el cambio
+        no fue agregar filas al final (ediciones, borrados), así las vistas incrementales saben
+        si alcanza con procesar las filas nuevas. `pendiente` es el momento de la última escritura
+        aplicada localmente que todavía no se confirmó contra la hoja (0 si no hay).
+        """
+        with self._lock:
+            r = self._con.execute(
+                "SELECT filas, ancho, version, generacion, sincronizado, reconciliado, pendiente, huella "
+                "FROM hojas WHERE nombre = ?", (hoja,)).fetchone()
+        if r is None:
+            return None
+        return {"filas": r[0], "ancho": r[1], "version": r[2], "generacion": r[3], "sincronizado": r[4],
+                "reconciliado": r[5], "pendiente": r[6], "huella": r[7]}
+
+    def leer(self, hoja, version=None):
+        """Devuelve (encabezados, filas) tal como están en la hoja, sin la fila de títulos.
+
+        Si se indica `version` y la copia local ya no es esa versión devuelve None.
+        """
+        with self._lock:
+            meta = self._con.execute("SELECT encabezados, version FROM hojas WHERE nombre = ?", (hoja,)).fetchone()
+            if meta is None or (version is not None and meta[1] != version):
+                return None
+            filas = self._con.execute(
+                "SELECT valores FROM filas WHERE hoja = ? ORDER BY fila", (hoja,)).fetchall()
+        return json.loads(meta[0]), [json.loads(f[0]) for f in filas]
+
+    def fila_de(self, hoja, *valores):
+        """Número de fila en la hoja del registro con esa clave (el primero si hay repetidos)."""
+        with self._lock:
+            r = self._con.execute("SELECT fila FROM claves WHERE hoja = ? AND clave = ?",
+                                  (hoja, clave_registro(valores))).fetchone()
+        return r[0] if r else None
+
+    def columnas(self, hoja):
+        """Mapa nombre de columna (normalizado) -> número de columna en la hoja."""
+        with self._lock:
+            meta = self._con.execute("SELECT encabezados FROM hojas WHERE nombre = ?", (hoja,)).fetchone()
+        if meta is None:
+            return {}
+        mapa = {}
+        for i, h in enumerate(json.loads(meta[0])):
+            mapa.setdefault(str(h).strip().upper(), i + 1)
+        return mapa
+
+    def reemplazar(self, hoja, valores, leido=None):
+        """Guarda el contenido completo de la hoja (resultado de get_all_values).
+
+        Solo incrementa la versión si el contenido cambió respecto de la copia local.
+        `leido` es el momento en que se pidió la lectura: si hay una escritura local posterior
+        la lectura no la incluye y se descarta (la confirma la próxima sincronización).
+        """
+        valores = [_normalizar(f) for f in valores]
+        encabezados = valores[0] if valores else []
+        filas = valores[1:]
+        ancho = max([len(f) for f in valores] + [0])
+        ahora = time.time()
+
+        with self._lock:
+            actual = self._con.execute(
+                "SELECT huella, version, generacion, filas, pendiente FROM hojas WHERE nombre = ?", (hoja,)).fetchone()
+            if actual is not None and leido is not None and actual[4] > leido:
+                return False
+            # Huella de las filas que ya había: si coincide, el cambio fue solo agregar al final
+            previas = actual[3] + 1 if actual is not None else 0
+            huella_previa = _huella("", valores[:previas])
+            huella = _huella(huella_previa, valores[previas:])
+            if actual is not None and actual[0] == huella:
+                self._con.execute(
+                    "UPDATE hojas SET sincronizado = ?, reconciliado = ?, pendiente = 0 WHERE nombre = ?",
+                    (ahora, ahora, hoja))
+                return False
+
+            version = actual[1] + 1 if actual is not None else 1
+            if actual is None:
+                generacion = 1
+            else:
+                generacion = actual[2] if actual[0] == huella_previa else actual[2] + 1
+            self._con.execute("BEGIN IMMEDIATE")
+            try:
+                self._con.execute("DELETE FROM filas WHERE hoja = ?", (hoja,))
+                self._con.executemany(
+                    "INSERT INTO filas (hoja, fila, valores) VALUES (?, ?, ?)",
+                    [(hoja, i + 2, json.dumps(f, ensure_ascii=False)) for i, f in enumerate(filas)])
+                self._con.execute("DELETE FROM claves WHERE hoja = ?", (hoja,))
+                self._con.executemany("INSERT OR IGNORE INTO claves (hoja, clave, fila) VALUES (?, ?, ?)",
+                                      self._filas_clave(hoja, encabezados, filas, 2))
+                self._con.execute(
+                    "INSERT OR REPLACE INTO hojas "
+                    "(nombre, encabezados, filas, ancho, huella, version, generacion, sincronizado, reconciliado) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (hoja, json.dumps(encabezados, ensure_ascii=False), len(filas), ancho, huella,
+                     version, generacion, ahora, ahora))
+                self._con.execute("COMMIT")
+            except Exception:
+                self._con.execute("ROLLBACK")
+                raise
+        return True
+
+    def confirmar(self, hoja, huella, leido, completa):
+        """Marca la hoja como sincronizada sin cambiar el contenido (otra instancia leyó lo mismo).
+
+        Solo vale si la copia local sigue teniendo esa huella y no hay escrituras locales
+        posteriores a la lectura.
+        """
+        ahora = time.time()
+        with self._lock:
+            cur = self._con.execute(
+                "UPDATE hojas SET sincronizado = ?, reconciliado = CASE WHEN ? THEN ? ELSE reconciliado END, "
+                "pendiente = 0 WHERE nombre = ? AND huella = ? AND pendiente <= ?",
+                (ahora, bool(completa), ahora, hoja, huella, leido))
+        return cur.rowcount > 0
+
+    def agregar(self, hoja, nuevas, leido=None):
+        """Agrega al final las filas leídas a partir de la última conocida (lectura delta)."""
+        nuevas = [_normalizar(f) for f in nuevas]
+        ahora = time.time()
+
+        with self._lock:
+            actual = self._con.execute(
+                "SELECT filas, ancho, huella, version, encabezados, pendiente FROM hojas WHERE nombre = ?",
+                (hoja,)).fetchone()
+            if actual is None:
+                raise KeyError(hoja)
+            filas, ancho, huella, version, encabezados, pendiente = actual
+            if leido is not None and pendiente > leido:
+                return False
+            if not nuevas:
+                self._con.execute("UPDATE hojas SET sincronizado = ? WHERE nombre = ?", (ahora, hoja))
+                return False
+
+            self._con.execute("BEGIN IMMEDIATE")
+            try:
+                self._con.executemany(
+                    "INSERT OR REPLACE INTO filas (hoja, fila, valores) VALUES (?, ?, ?)",
+                    [(hoja, filas + i + 2, json.dumps(f, ensure_ascii=False)) for i, f in enumerate(nuevas)])
+                self._con.executemany("INSERT OR IGNORE INTO claves (hoja, clave, fila) VALUES (?, ?, ?)",
+                                      self._filas_clave(hoja, json.loads(encabezados), nuevas, filas + 2))
+                self._con.execute(
+                    "UPDATE hojas SET filas = ?, ancho = ?, huella = ?, version = ?, sincronizado = ? "
+                    "WHERE nombre = ?",
+                    (filas + len(nuevas), max([ancho] + [len(f) for f in nuevas]), _huella(huella, nuevas),
+                     version + 1, ahora, hoja))
+                self._con.execute("COMMIT")
+            except Exception:
+                self._con.execute("ROLLBACK")
+                raise
+        return True
+
+    # --- ESCRITURAS APLICADAS LOCALMENTE ---
+    # Lo que la app escribe en la hoja se aplica también acá, así la página se vuelve a dibujar
+    # sin leer la hoja. La hoja queda marcada como pendiente hasta que una lectura completa
+    # posterior a la escritura la confirme (y corrija, si la hoja guardó otra cosa).
+
+    def aplicar_agregado(self, hoja, fila, valores):
+        """Agrega localmente la fila que se acaba de escribir en el número de fila `fila`.
+
+        Devuelve False si no es la siguiente a la última conocida (otros agregaron filas que
+        todavía no están en la réplica); en ese caso hay que sincronizar.
+        """
+        nueva = _normalizar([texto_celda(v) for v in valores])
+        with self._lock:
+            actual = self._con.execute(
+                "SELECT filas, ancho, huella, version, encabezados FROM hojas WHERE nombre = ?",
+                (hoja,)).fetchone()
+            if actual is None or fila != actual[0] + 2:
+                return False
+            filas, ancho, huella, version, encabezados = actual
+            self._con.execute("BEGIN IMMEDIATE")
+            try:
+                self._con.execute("INSERT OR REPLACE INTO filas (hoja, fila, valores) VALUES (?, ?, ?)",
+                                  (hoja, fila, json.dumps(nueva, ensure_ascii=False)))
+                self._con.executemany("INSERT OR IGNORE INTO claves (hoja, clave, fila) VALUES (?, ?, ?)",
+                                      self._filas_clave(hoja, json.loads(encabezados), [nueva], fila))
+                self._con.execute(
+                    "UPDATE hojas SET filas = ?, ancho = ?, huella = ?, version = ?, pendiente = ? WHERE nombre = ?",
+                    (filas + 1, max(ancho, len(nueva)), _huella(huella, [nueva]), version + 1, time.time(), hoja))
+                self._con.execute("COMMIT")
+            except Exception:
+                self._con.execute("ROLLBACK")
+                raise
+        return True
+
+    def aplicar_celdas(self, hoja, cambios):
+        """Aplica localmente cambios de celdas [(fila, columna, valor)] (fila 1 = encabezados)."""
+        with self._lock:
+            actual = self._con.execute(
+                "SELECT ancho, version, generacion, encabezados FROM hojas WHERE nombre = ?", (hoja,)).fetchone()
+            if actual is None:
+                return False
+            ancho, version, generacion, encabezados = actual
+            encabezados = json.loads(encabezados)
+            filas = {f: json.loads(v) for f, v in self._con.execute(
+                "SELECT fila, valores FROM filas WHERE hoja = ?", (hoja,))}
+            tocadas = set()
+            for fila, col, valor in cambios:
+                destino = encabezados if fila == 1 else filas.setdefault(fila, [])
+                destino.extend([""] * (col - len(destino)))
+                destino[col - 1] = texto_celda(valor)
+                if fila != 1:
+                    tocadas.add(fila)
+            encabezados = _normalizar(encabezados)
+            for fila in tocadas:
+                filas[fila] = _normalizar(filas[fila])
+            ultima = max(filas, default=1)
+            todas = [encabezados] + [filas.get(f, []) for f in range(2, ultima + 1)]
+
+            self._con.execute("BEGIN IMMEDIATE")
+            try:
+                self._con.executemany(
+                    "INSERT OR REPLACE INTO filas (hoja, fila, valores) VALUES (?, ?, ?)",
+                    [(hoja, f, json.dumps(filas[f], ensure_ascii=False)) for f in sorted(tocadas)])
+                # Las claves de las filas editadas se recalculan (puede haber cambiado la columna clave)
+                self._con.execute("DELETE FROM claves WHERE hoja = ?", (hoja,))
+                self._con.executemany("INSERT OR IGNORE INTO claves (hoja, clave, fila) VALUES (?, ?, ?)",
+                                      self._filas_clave(hoja, encabezados, todas[1:], 2))
+                self._con.execute(
+                    "UPDATE hojas SET encabezados = ?, filas = ?, ancho = ?, huella = ?, version = ?, "
+                    "generacion = ?, pendiente = ? WHERE nombre = ?",
+                    (json.dumps(encabezados, ensure_ascii=False), ultima - 1,
+                     max([ancho] + [len(f) for f in todas]), _huella("", todas), version + 1,
+                     generacion + 1, time.time(), hoja))
+                self._con.execute("COMMIT")
+            except Exception:
+                self._con.execute("ROLLBACK")
+                raise
+        return True
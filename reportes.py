@@ -0,0 +1,154 @@
+import io
+import os
+import re
+import sys
+import types
+import zipfile
+import threading
+import multiprocessing
+from contextlib import contextmanager
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from fpdf import FPDF
+
+# Los logos se buscan junto a este archivo, así funciona igual en los procesos de trabajo
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Logos del encabezado: (archivo, x, y, ancho)
+LOGOS_PDF = [("logo_conci.png", 10, 8, 40), ("logo_desafio.png", 175, 10, 15)]
+
+
+@lru_cache(maxsize=None)
+def logos_pdf():
+    """Decodifica los PNG de los logos una sola vez por proceso (es lo más lento del PDF)."""
+    parser = FPDF()
+    logos = {}
+    for archivo, _, _, _ in LOGOS_PDF:
+        try:
+            logos[archivo] = parser._parsepng(os.path.join(BASE_DIR, archivo))
+        except Exception:
+            pass
+    return logos
+
+
+# --- FUNCIÓN GENERADORA DE PDF ---
+def generar_pdf(nombre_cliente, categoria, score, score_max, tabla_data, recomendaciones):
+    pdf = FPDF()
+    pdf.add_page()
+
+    # Encabezado con Logos (FPDF reutiliza la imagen si ya está registrada en el documento;
+    # se copia el dict porque FPDF le borra los datos al escribir el archivo)
+    for archivo, x, y, w in LOGOS_PDF:
+        info = logos_pdf().get(archivo)
+        if info is not None:
+            pdf.images[archivo] = dict(info, i=len(pdf.images) + 1)
+            pdf.image(archivo, x=x, y=y, w=w)
+
+    pdf.ln(25)  # Espacio tras los logos
+
+    # Título Principal
+    pdf.set_font("Arial", 'B', 16)
+    pdf.set_text_color(40, 167, 69)
+    pdf.cell(190, 10, "Reporte SmartFarm", 0, 1, 'C')
+    pdf.ln(5)
+
+    # Datos Generales
+    pdf.set_text_color(0, 0, 0)
+    pdf.set_font("Arial", 'B', 12)
+    pdf.cell(95, 10, f"Cliente: {nombre_cliente}", 0, 0)
+    pdf.cell(95, 10, f"Categoria: {categoria}", 0, 1)
+
+    pdf.set_font("Arial", '', 12)
+    pdf.cell(95, 10, f"Puntaje Obtenido: {score:.0f} / {score_max:.0f}", 0, 0)
+    perc = (score / score_max * 100) if score_max > 0 else 0
+    pdf.cell(95, 10, f"Estado de Avance: {perc:.1f}%", 0, 1)
+    pdf.ln(10)
+
+    # Tabla de Resultados
+    pdf.set_font("Arial", 'B', 10)
+    pdf.set_fill_color(230, 230, 230)
+    pdf.cell(130, 10, "Punto Evaluado", 1, 0, 'C', True)
+    pdf.cell(30, 10, "Puntaje", 1, 0, 'C', True)
+    pdf.cell(30, 10, "Estado", 1, 1, 'C', True)
+
+    pdf.set_font("Arial", '', 9)
+    for row in tabla_data:
+        y_before = pdf.get_y()
+        pdf.multi_cell(130, 8, row["Punto Evaluado"], 1)
+        y_after = pdf.get_y()
+        h = y_after - y_before
+
+        pdf.set_xy(140, y_before)
+        pdf.cell(30, h, row["Puntaje"], 1, 0, 'C')
+        txt_estado = row["Estado"].replace("✅ ", "").replace("⚠️ ", "").replace("❌ ", "")
+        pdf.cell(30, h, txt_estado, 1, 1, 'C')
+
+    # Recomendaciones Finales
+    if recomendaciones:
+        pdf.ln(10)
+        pdf.set_font("Arial", 'B', 12)
+        pdf.set_text_color(40, 167, 69)
+        pdf.cell(190, 10, "Plan de Accion y Recomendaciones:", 0, 1, 'L')
+        pdf.set_text_color(0, 0, 0)
+        pdf.set_font("Arial", '', 11)
+        pdf.multi_cell(190, 7, recomendaciones, 0, 'L')
+
+    return pdf.output(dest='S').encode('latin-1', 'ignore')
+
+
+# --- GENERACIÓN MASIVA ---
+def nombre_archivo_pdf(nombre_cliente, id_cliente, fecha):
+    base = f"Reporte_SmartFarm_{nombre_cliente}_{id_cliente}_{fecha}"
+    return re.sub(r'[^\w\-]+', '_', base).strip('_') + ".pdf"
+
+
+def _renderizar(trabajo):
+    """Tarea de cada proceso: devuelve (nombre de archivo, bytes del PDF)."""
+    return trabajo["archivo"], generar_pdf(
+        trabajo["nombre_cliente"], trabajo["categoria"], trabajo["score"], trabajo["score_max"],
+        trabajo["tabla_data"], trabajo["recomendaciones"])
+
+
+_main_lock = threading.Lock()
+
+
+@contextmanager
+def _sin_main_del_script():
+    """Deja un __main__ vacío (sin __file__) mientras se crean los procesos de trabajo.
+
+    Un proceso spawn vuelve a ejecutar el __main__ del padre; dentro de Streamlit ese __main__
+    es la página, que en cada proceso cargaría las hojas y arrancaría la sincronización.
+    """
+    vacio = types.ModuleType("__main__")
+    with _main_lock:
+        previo = sys.modules.get("__main__")
+        sys.modules["__main__"] = vacio
+        try:
+            yield
+        finally:
+            # Si otra sesión empezó a correr su script en el medio, su __main__ se respeta
+            if sys.modules.get("__main__") is vacio:
+                sys.modules["__main__"] = previo
+
+
+def generar_reportes_zip(trabajos, al_avanzar=None, procesos=None):
+    """Renderiza los reportes en paralelo (un proceso por núcleo) y los devuelve en un ZIP.
+
+    `trabajos` es una lista de dicts con los argumentos de generar_pdf más "archivo";
+    `al_avanzar(hechos, total)` se llama cada vez que termina un reporte.
+    """
+    total = len(trabajos)
+    buffer = io.BytesIO()
+    # spawn: no se hace fork del proceso de Streamlit con sus hilos
+    contexto = multiprocessing.get_context("spawn")
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf, \
+            ProcessPoolExecutor(max_workers=procesos or os.cpu_count(), mp_context=contexto,
+                                initializer=logos_pdf) as pool:
+        # Los procesos se crean al encolar los trabajos
+        with _sin_main_del_script():
+            futuros = [pool.submit(_renderizar, t) for t in trabajos]
+        for hechos, futuro in enumerate(as_completed(futuros), start=1):
+            archivo, pdf_bytes = futuro.result()
+            zf.writestr(archivo, pdf_bytes)
+            if al_avanzar:
+                al_avanzar(hechos, total)
+    return buffer.getvalue()
@@ -0,0 +1,127 @@
+import threading
+import pandas as pd
+import streamlit as st
+from conexion import load_data_estado, MAIN_WORKSHEET_NAME, COL_PUNTAJE
+from vistas import META_CERTIFICACION
+
+# --- TENDENCIAS EN EL TIEMPO ---
+# Agregados por mes x sucursal x categoría de Hoja 1. Son sumas y conteos, así que una
+# evaluación nueva solo suma en su celda y no hace falta reagrupar toda la hoja.
+
+CLAVE_ROLLUP = ["MES", "SUCURSAL", "CATEGORÍA DE EVALUACIÓN"]
+COLUMNAS_ROLLUP = ["EVALUACIONES", "PUNTAJE_SUMA", "CERTIFICADAS"]
+
+
+def _agregar_lote(df):
+    """Rollup de un lote de evaluaciones (sumas y conteos por mes, sucursal y categoría)."""
+    lote = pd.DataFrame({
+        "MES": df['FECHA Y HORA'].dt.to_period("M"),
+        "SUCURSAL": df['SUCURSAL'].astype(str),
+        "CATEGORÍA DE EVALUACIÓN": df['CATEGORÍA DE EVALUACIÓN'].astype(str),
+        "PUNTAJE": df[COL_PUNTAJE].astype("float64"),
+        "CERTIFICA": df[COL_PUNTAJE] >= META_CERTIFICACION,
+    }).dropna(subset=["MES"])
+    return lote.groupby(CLAVE_ROLLUP).agg(
+        EVALUACIONES=("PUNTAJE", "size"),
+        PUNTAJE_SUMA=("PUNTAJE", "sum"),
+        CERTIFICADAS=("CERTIFICA", "sum"),
+    )
+
+
+class RollupsTendencias:
+    """Rollups mensuales y fechas de certificación por cliente, mantenidos en forma incremental.
+
+    Igual que EvaluacionesActuales: mientras la generación de Hoja 1 no cambie solo se procesan
+    las filas nuevas; si cambió se recalcula todo.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generacion = None
+        self._procesadas = 0
+        self._rollup = pd.DataFrame(columns=COLUMNAS_ROLLUP)
+        self._primera = {}        # ID CLIENTE -> fecha de la primera evaluación
+        self._certificacion = {}  # ID CLIENTE -> fecha de la primera evaluación >= META_CERTIFICACION
+        self._version = None
+        self._vistas = None
+
+    def _procesar(self, df):
+        rollup = _agregar_lote(df)
+        self._rollup = rollup if self._rollup.empty else self._rollup.add(rollup, fill_value=0)
+
+        ids = df['ID CLIENTE'].astype(str)
+        fechas = df['FECHA Y HORA']
+        for destino, filtro in ((self._primera, fechas.notna()),
+                                (self._certificacion, fechas.notna() & (df[COL_PUNTAJE] >= META_CERTIFICACION))):
+            for i, f in fechas[filtro].groupby(ids[filtro]).min().items():
+                if i not in destino or f < destino[i]:
+                    destino[i] = f
+
+    def actualizar(self, df, estado):
+        """Devuelve (rollup mensual, tiempos de certificación) para esta versión de la hoja."""
+        with self._lock:
+            if estado["version"] == self._version:
+                return self._vistas
+            if estado["generacion"] != self._generacion or len(df) < self._procesadas:
+                self._rollup = pd.DataFrame(columns=COLUMNAS_ROLLUP)
+                self._primera, self._certificacion = {}, {}
+                self._procesar(df)
+            elif len(df) > self._procesadas:
+                self._procesar(df.iloc[self._procesadas:])
+            self._generacion, self._procesadas = estado["generacion"], len(df)
+
+            mensual = self._rollup.reset_index()
+            if not mensual.empty:
+                mensual["MES"] = mensual["MES"].dt.to_timestamp()
+                mensual[["EVALUACIONES", "CERTIFICADAS"]] = mensual[["EVALUACIONES", "CERTIFICADAS"]].astype("int64")
+                mensual["PUNTAJE_PROMEDIO"] = mensual["PUNTAJE_SUMA"] / mensual["EVALUACIONES"]
+
+            tiempos = pd.DataFrame({"PRIMERA": pd.Series(self._primera, dtype="datetime64[ns]"),
+                                    "CERTIFICACION": pd.Series(self._certificacion, dtype="datetime64[ns]")})
+            tiempos["DIAS"] = (tiempos["CERTIFICACION"] - tiempos["PRIMERA"]).dt.days
+            tiempos = tiempos.rename_axis("ID CLIENTE").reset_index()
+
+            self._version, self._vistas = estado["version"], (mensual, tiempos)
+            return self._vistas
+
+
+@st.cache_resource
+def _rollups():
+    return RollupsTendencias()
+
+
+def _vigentes():
+    df, estado = load_data_estado(MAIN_WORKSHEET_NAME)
+    if estado is None or df.empty:
+        return None
+    return _rollups().actualizar(df, estado)
+
+
+def rollup_mensual():
+    """Evaluaciones, puntaje promedio y certificadas por MES, SUCURSAL y CATEGORÍA DE EVALUACIÓN."""
+    vigentes = _vigentes()
+    if vigentes is None:
+        return pd.DataFrame(columns=CLAVE_ROLLUP + COLUMNAS_ROLLUP + ["PUNTAJE_PROMEDIO"])
+    return vigentes[0]
+
+
+def certificacion_trimestral(mensual, por=None):
+    """% de evaluaciones que alcanzan META_CERTIFICACION por trimestre (y por `por`, si se indica).
+
+    `mensual` es rollup_mensual(), eventualmente filtrado por sucursal o categoría.
+    """
+    claves = ["TRIMESTRE"] + ([por] if por else [])
+    if mensual.empty:
+        return pd.DataFrame(columns=claves + ["EVALUACIONES", "CERTIFICADAS", "TASA"])
+    trimestral = mensual.assign(TRIMESTRE=mensual["MES"].dt.to_period("Q").astype(str)).groupby(claves).agg(
+        EVALUACIONES=("EVALUACIONES", "sum"), CERTIFICADAS=("CERTIFICADAS", "sum")).reset_index()
+    trimestral["TASA"] = trimestral["CERTIFICADAS"] / trimestral["EVALUACIONES"] * 100
+    return trimestral
+
+
+def tiempo_certificacion():
+    """Por cliente: fecha de la primera evaluación, de la primera certificación y días entre ambas."""
+    vigentes = _vigentes()
+    if vigentes is None:
+        return pd.DataFrame(columns=["ID CLIENTE", "PRIMERA", "CERTIFICACION", "DIAS"])
+    return vigentes[1]
@@ -0,0 +1,166 @@
+"""Pruebas de la caché compartida (cache_compartido.py) y del single-flight de sincronizar_hojas.
+
+    python -m pytest -q tests
+"""
+import os
+import sys
+import time
+import logging
+import tempfile
+import threading
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# La configuración de la app se lee al importar conexion
+os.environ.setdefault("SMARTFARM_REPLICA_DIR", tempfile.mkdtemp(prefix="smartfarm-tests-"))
+sys.path.insert(0, RAIZ)
+
+import metricas
+import conexion
+from replica import ReplicaLocal
+from almacenamiento import AlmacenGoogleSheets
+from cache_compartido import CacheCompartido, CacheMemoria, CacheSQLite, CacheRedis, crear_cache
+
+# Fuera de `streamlit run` cada st.* avisa que no hay ScriptRunContext
+logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").disabled = True
+
+LATENCIA = 0.5
+
+
+class PlanillaLenta:
+    """Planilla con una sola hoja de evaluaciones que tarda LATENCIA en cada lectura."""
+
+    def __init__(self, filas):
+        self.valores = [["FECHA Y HORA", "ID CLIENTE", "CLIENTE"]] + \
+            [[f"01/01/2025 10:{i % 60:02d}:00", str(1000000 + i), f"Cliente {i}"] for i in range(filas)]
+        self.lecturas = 0
+
+    def values_batch_get(self, rangos, params=None):
+        self.lecturas += 1
+        time.sleep(LATENCIA)
+        return {"valueRanges": [{"range": r, "values": self.valores} for r in rangos]}
+
+
+# --- BACKENDS ---
+
+@pytest.fixture(params=["memoria", "sqlite", "redis"])
+def cache(request, tmp_path):
+    if request.param == "memoria":
+        return CacheMemoria()
+    if request.param == "sqlite":
+        return CacheSQLite(str(tmp_path / "compartido.db"))
+    pytest.importorskip("redis")
+    cache = CacheRedis(os.getenv("SMARTFARM_TEST_REDIS", "redis://localhost:6379/15"),
+                       prefijo=f"smartfarm-test-{time.time_ns()}:")
+    try:
+        cache._redis.ping()
+    except Exception as e:
+        pytest.skip(f"Redis no disponible: {e}")
+    return cache
+
+
+def test_guardar_y_obtener_json(cache):
+    assert cache.obtener_json("hoja:x") is None
+    cache.guardar_json("hoja:x", {"leido": 1.5, "huella": "ñandú"}, 60)
+    assert cache.obtener_json("hoja:x") == {"leido": 1.5, "huella": "ñandú"}
+
+
+def test_los_valores_vencen(cache):
+    cache.guardar("clave", b"valor", 0.2)
+    assert cache.obtener("clave") == b"valor"
+    time.sleep(0.3)
+    assert cache.obtener("clave") is None
+
+
+def test_lease_exclusivo(cache):
+    token = cache.tomar_lease("hoja:x", 60)
+    assert token is not None
+    assert cache.tomar_lease("hoja:x", 60) is None
+    # Solo lo libera quien tiene el token
+    cache.liberar_lease("hoja:x", "otro")
+    assert cache.tomar_lease("hoja:x", 60) is None
+    cache.liberar_lease("hoja:x", token)
+    assert cache.tomar_lease("hoja:x", 60) is not None
+
+
+def test_lease_vence(cache):
+    assert cache.tomar_lease("hoja:x", 0.2) is not None
+    time.sleep(0.3)
+    assert cache.tomar_lease("hoja:x", 60) is not None
+
+
+def test_sqlite_compartido_entre_conexiones(tmp_path):
+    ruta = str(tmp_path / "compartido.db")
+    una, otra = CacheSQLite(ruta), CacheSQLite(ruta)
+    una.guardar_json("hoja:x", [1, 2], 60)
+    assert otra.obtener_json("hoja:x") == [1, 2]
+    assert una.tomar_lease("hoja:x", 60) is not None
+    assert otra.tomar_lease("hoja:x", 60) is None
+
+
+def test_backend_incompleto():
+    class SinLeases(CacheCompartido):
+        def obtener(self, clave):
+            return None
+
+        def guardar(self, clave, valor, ttl):
+            pass
+
+    with pytest.raises(TypeError):
+        SinLeases()
+
+
+def test_crear_cache(tmp_path):
+    assert isinstance(crear_cache(None, str(tmp_path)), CacheMemoria)
+    assert isinstance(crear_cache("sqlite", str(tmp_path)), CacheSQLite)
+    assert os.path.exists(tmp_path / "compartido.db")
+    assert isinstance(crear_cache(f"sqlite:{tmp_path / 'otra.db'}", str(tmp_path)), CacheSQLite)
+    with pytest.raises(ValueError):
+        crear_cache("memcached://localhost", str(tmp_path))
+
+
+# --- SINGLE-FLIGHT ---
+
+@pytest.mark.parametrize("backend", ["memoria", "sqlite"])
+def test_una_sola_lectura_por_hoja(backend, tmp_path, monkeypatch):
+    """Dos llamadas a la vez sobre la misma hoja: una la trae de la API y la otra usa ese resultado.
+
+    Con memoria las dos comparten la réplica (un proceso); con sqlite cada una tiene la suya
+    (dos instancias que solo comparten la caché).
+    """
+    compartido = CacheMemoria() if backend == "memoria" else CacheSQLite(str(tmp_path / "compartido.db"))
+    if backend == "memoria":
+        replica = ReplicaLocal(str(tmp_path / "replica.db"), claves=conexion.ROW_KEYS)
+        replicas = {"a": replica, "b": replica}
+    else:
+        replicas = {n: ReplicaLocal(str(tmp_path / f"replica-{n}.db"), claves=conexion.ROW_KEYS) for n in "ab"}
+    planilla = PlanillaLenta(200)
+    monkeypatch.setattr(conexion, "get_cache_compartido", lambda: compartido)
+    monkeypatch.setattr(conexion, "get_replica", lambda: replicas[threading.current_thread().name])
+    monkeypatch.setattr(conexion, "get_almacen", lambda: AlmacenGoogleSheets(lambda: planilla))
+    metricas.reiniciar()
+
+    demoras, errores = {}, []
+
+    def llamar():
+        inicio = time.perf_counter()
+        try:
+            conexion.sincronizar_hojas(conexion.MAIN_WORKSHEET_NAME)
+        except Exception as e:
+            errores.append(e)
+        demoras[threading.current_thread().name] = time.perf_counter() - inicio
+
+    hilos = [threading.Thread(target=llamar, name=n) for n in "ab"]
+    hilos[0].start()
+    time.sleep(LATENCIA / 5)
+    hilos[1].start()
+    for h in hilos:
+        h.join()
+
+    assert not errores
+    assert planilla.lecturas == 1
+    assert metricas.contadores().get("compartida.usadas") == 1
+    # La que esperó termina poco después de la lectura, no al cabo de LEASE_WAIT
+    assert demoras["b"] < LATENCIA + 1 < conexion.LEASE_WAIT
+    for replica in replicas.values():
+        assert replica.estado(conexion.MAIN_WORKSHEET_NAME)["filas"] > 0
@@ -0,0 +1,51 @@
+"""Pruebas de la generación masiva de reportes (reportes.py).
+
+    python -m pytest -q tests
+"""
+import io
+import os
+import sys
+import types
+import zipfile
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import reportes
+
+TRABAJO = {
+    "nombre_cliente": "Cliente 1000001",
+    "categoria": "Granos",
+    "score": 80,
+    "score_max": 150,
+    "tabla_data": [{"Punto Evaluado": "Monitor de rendimiento", "Puntaje": "5/5", "Estado": "✅ Óptimo"}],
+    "recomendaciones": "",
+}
+
+
+def test_zip_con_un_pdf_por_trabajo():
+    avances = []
+    trabajos = [dict(TRABAJO, archivo=f"reporte_{i}.pdf") for i in range(3)]
+    contenido = reportes.generar_reportes_zip(trabajos, al_avanzar=lambda h, t: avances.append((h, t)), procesos=2)
+    with zipfile.ZipFile(io.BytesIO(contenido)) as zf:
+        assert sorted(zf.namelist()) == ["reporte_0.pdf", "reporte_1.pdf", "reporte_2.pdf"]
+        assert zf.read("reporte_0.pdf").startswith(b"%PDF")
+    assert avances == [(1, 3), (2, 3), (3, 3)]
+
+
+def test_los_procesos_no_ejecutan_la_pagina(tmp_path, monkeypatch):
+    """Dentro de Streamlit el __main__ es la página (con __file__): los procesos spawn no deben correrla."""
+    marca = tmp_path / "pagina_ejecutada"
+    pagina = tmp_path / "pagina.py"
+    pagina.write_text(f"open({str(marca)!r}, 'a').write('x')\n", encoding="utf-8")
+    main = types.ModuleType("__main__")
+    main.__file__ = str(pagina)
+    monkeypatch.setitem(sys.modules, "__main__", main)
+
+    trabajos = [dict(TRABAJO, archivo=f"reporte_{i}.pdf") for i in range(4)]
+    contenido = reportes.generar_reportes_zip(trabajos, procesos=2)
+
+    assert not marca.exists()
+    assert sys.modules["__main__"] is main
+    with zipfile.ZipFile(io.BytesIO(contenido)) as zf:
+        assert len(zf.namelist()) == 4
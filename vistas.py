@@ -0,0 +1,257 @@
+import threading
+import numpy as np
+import pandas as pd
+import streamlit as st
+from conexion import load_data_version, load_data_estado, MAIN_WORKSHEET_NAME, COL_PUNTAJE
+from esquemas import COLUMNAS_CLAVE
+from evaluacion import EVALUATION_MAP, EVALUATION_CATEGORIES, ESCALAS, OPTIMO, matriz_puntajes, puntuar
+
+# --- VISTAS DERIVADAS ---
+# Los DataFrames de load_data son compartidos entre sesiones y no se modifican. Las columnas
+# que agregan las páginas (certificación, totales) se calculan acá una vez por versión de la hoja
+# y también quedan compartidas. Las etiquetas para elegir registros están en busqueda.py.
+
+PROJECTS_WORKSHEET_NAME = "Proyectos Analyzer"
+SALES_WORKSHEET_NAME = "Ventas SmartFarm"
+# Puntaje a partir del cual un cliente certifica
+META_CERTIFICACION = 105
+# Hojas de detalle de cada categoría de evaluación (se llaman igual que la categoría)
+HOJAS_DETALLE = [EVALUATION_MAP[cat]["worksheet"] for cat in EVALUATION_CATEGORIES]
+# Clave de una evaluación en todas las hojas (el ID se compara como texto)
+CLAVE_EVALUACION = ["ID CLIENTE", "FECHA Y HORA"]
+HORAS_PROYECTO = ["PLANIFICACIÓN - HORAS", "RECOPILACIÓN DE DATOS - HORAS", "GENERACIÓN DE INFORME - HORAS"]
+
+
+def _vista(ws_name, derivar):
+    return _vista_version(ws_name, derivar)[0]
+
+
+def _vista_version(ws_name, derivar):
+    df, version = load_data_version(ws_name)
+    if version is None or df.empty:
+        return df, version
+    return derivar(version, df), version
+
+
+@st.cache_resource(max_entries=4)
+def _evaluaciones(version, _df):
+    return _df.assign(CERTIFICA=_df[COL_PUNTAJE] >= META_CERTIFICACION)
+
+
+def evaluaciones():
+    """Hoja 1 con CERTIFICA (puntaje >= META_CERTIFICACION)."""
+    return _vista(MAIN_WORKSHEET_NAME, _evaluaciones)
+
+
+@st.cache_resource(max_entries=4)
+def _proyectos(version, _df):
+    return _df.assign(TOTAL_HS=_df[[c for c in HORAS_PROYECTO if c in _df.columns]].sum(axis=1))
+
+
+def proyectos():
+    """Proyectos Analyzer con TOTAL_HS."""
+    return _vista(PROJECTS_WORKSHEET_NAME, _proyectos)
+
+
+def vista_version(ws_name):
+    """(DataFrame, versión) de la hoja con sus columnas derivadas, si las tiene (para analitica.py)."""
+    derivar = {MAIN_WORKSHEET_NAME: _evaluaciones, PROJECTS_WORKSHEET_NAME: _proyectos}.get(ws_name)
+    return _vista_version(ws_name, derivar) if derivar else load_data_version(ws_name)
+
+
+# --- ÚLTIMA EVALUACIÓN POR CLIENTE ---
+class EvaluacionesActuales:
+    """Última evaluación de cada cliente e historial de evaluaciones, mantenidos en forma incremental.
+
+    Mientras la generación de Hoja 1 no cambie (solo se agregaron filas al final) se procesan
+    únicamente las filas nuevas; si cambió (ediciones, borrados) se reconstruye desde cero.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generacion = None
+        self._procesadas = 0
+        self._ultima = {}     # ID CLIENTE -> (fecha, posición de la última evaluación)
+        self._historial = {}  # ID CLIENTE -> posiciones de todas sus evaluaciones
+        self._version = None
+        self._df = None
+        self._actual = None
+
+    def _reconstruir(self, ids, fechas):
+        # Sin fecha cuenta como la más vieja; a igual fecha gana la fila de más abajo
+        orden = pd.DataFrame({"ID": ids, "FECHA": fechas}).sort_values("FECHA", kind="stable", na_position="first")
+        ultimas = orden[~orden["ID"].duplicated(keep="last")]
+        self._ultima = {i: (f, p) for i, f, p in zip(ultimas["ID"], ultimas["FECHA"], ultimas.index)}
+        self._historial = {i: list(p) for i, p in pd.Series(range(len(ids))).groupby(ids).groups.items()}
+
+    def _agregar(self, ids, fechas, desde):
+        for pos, (i, f) in enumerate(zip(ids[desde:], fechas[desde:]), start=desde):
+            previa = self._ultima.get(i)
+            if previa is None or pd.isna(previa[0]) or (not pd.isna(f) and f >= previa[0]):
+                self._ultima[i] = (f, pos)
+            self._historial.setdefault(i, []).append(pos)
+
+    def actualizar(self, df, estado):
+        """Devuelve la vista de últimas evaluaciones para esta versión de la hoja."""
+        with self._lock:
+            if estado["version"] == self._version:
+                return self._actual
+            ids = df['ID CLIENTE'].astype(str).to_numpy()
+            fechas = df['FECHA Y HORA'].to_numpy()
+            if estado["generacion"] != self._generacion or len(df) < self._procesadas:
+                self._reconstruir(ids, fechas)
+            else:
+                self._agregar(ids, fechas, self._procesadas)
+            self._generacion, self._procesadas = estado["generacion"], len(df)
+
+            posiciones = sorted(p for _, p in self._ultima.values())
+            cantidad = {i: len(p) for i, p in self._historial.items()}
+            actual = df.iloc[posiciones]
+            self._actual = actual.assign(EVALUACIONES=actual['ID CLIENTE'].astype(str).map(cantidad).to_numpy())
+            self._version, self._df = estado["version"], df
+            return self._actual
+
+    def historial(self, id_cliente):
+        """Evaluaciones del cliente ordenadas por fecha (de la última versión procesada)."""
+        with self._lock:
+            if self._df is None:
+                return pd.DataFrame()
+            posiciones = self._historial.get(str(id_cliente), [])
+            return self._df.iloc[posiciones].sort_values('FECHA Y HORA')
+
+
+@st.cache_resource
+def _evaluaciones_actuales():
+    return EvaluacionesActuales()
+
+
+def evaluaciones_actuales():
+    """Hoja 1 (vista evaluaciones) con solo la última evaluación de cada cliente y su cantidad de evaluaciones."""
+    return evaluaciones_actuales_version()[0]
+
+
+def evaluaciones_actuales_version():
+    """(evaluaciones_actuales(), versión de Hoja 1) de una misma lectura de la hoja."""
+    df, estado = load_data_estado(MAIN_WORKSHEET_NAME)
+    if estado is None or df.empty:
+        return df, None
+    return _evaluaciones_actuales().actualizar(_evaluaciones(estado["version"], df), estado), estado["version"]
+
+
+def historial_cliente(id_cliente):
+    """Todas las evaluaciones del cliente, de la más vieja a la más nueva."""
+    if evaluaciones_actuales().empty:
+        return pd.DataFrame()
+    return _evaluaciones_actuales().historial(id_cliente)
+
+
+# --- TABLA DE HECHOS DE EVALUACIONES ---
+@st.cache_resource(max_entries=4)
+def _hechos(versiones, _principal, _detalles):
+    """Une Hoja 1 con la hoja de detalle de su categoría; una fila por evaluación.
+
+    Los puntajes de los items quedan en una matriz float32 (NaN si el item no corresponde a la
+    categoría o falta el detalle) y el índice (ID CLIENTE, FECHA Y HORA) permite buscar en O(1).
+    """
+    base = _principal.assign(**{'ID CLIENTE': _principal['ID CLIENTE'].astype(str)})
+    base = base.drop_duplicates(CLAVE_EVALUACION).set_index(CLAVE_EVALUACION)
+    categorias = base['CATEGORÍA DE EVALUACIÓN'].astype(str).to_numpy()
+
+    items = {}
+    for hoja, det in _detalles.items():
+        items[hoja] = [c for c in det.columns if c not in COLUMNAS_CLAVE and c != ""] if not det.empty else []
+    todos = list(dict.fromkeys(c for cols in items.values() for c in cols))
+    posicion = {c: i for i, c in enumerate(todos)}
+
+    matriz = np.full((len(base), len(todos)), np.nan, dtype="float32")
+    con_detalle = np.zeros(len(base), dtype=bool)
+    for hoja, det in _detalles.items():
+        if not items[hoja]:
+            continue
+        det = det.assign(**{'ID CLIENTE': det['ID CLIENTE'].astype(str)})
+        det = det.drop_duplicates(CLAVE_EVALUACION).set_index(CLAVE_EVALUACION)
+        filas = np.flatnonzero(categorias == hoja)
+        pos = det.index.get_indexer(base.index[filas])
+        ok = pos >= 0
+        matriz[np.ix_(filas[ok], [posicion[c] for c in items[hoja]])] = \
+            det[items[hoja]].to_numpy(dtype="float32")[pos[ok]]
+        con_detalle[filas[ok]] = True
+
+    tabla = pd.concat([base, pd.DataFrame(matriz, index=base.index, columns=todos)], axis=1)
+    tabla["CON DETALLE"] = con_detalle
+    return {"tabla": tabla, "base": list(base.columns), "items": items}
+
+
+def _datos_evaluacion():
+    """(versiones, Hoja 1, detalles por hoja); versiones es None si falta alguna hoja."""
+    principal, version = load_data_version(MAIN_WORKSHEET_NAME)
+    versiones, detalles = [version], {}
+    for hoja in HOJAS_DETALLE:
+        detalles[hoja], v = load_data_version(hoja)
+        versiones.append(v)
+    if principal.empty or None in versiones:
+        return None, principal, detalles
+    return tuple(versiones), principal, detalles
+
+
+def _hechos_vigentes():
+    versiones, principal, detalles = _datos_evaluacion()
+    return _hechos(versiones, principal, detalles) if versiones is not None else None
+
+
+def hechos_evaluaciones():
+    """Tabla de hechos: columnas de Hoja 1 + puntaje de cada item, indexada por (ID CLIENTE, FECHA Y HORA)."""
+    hechos = _hechos_vigentes()
+    return hechos["tabla"] if hechos is not None else pd.DataFrame()
+
+
+def items_categoria(categoria):
+    """Columnas de items de la hoja de detalle de la categoría, en el orden de la hoja."""
+    hechos = _hechos_vigentes()
+    return hechos["items"].get(categoria, []) if hechos is not None else []
+
+
+def registro_evaluacion(id_cliente, fecha_hora):
+    """Fila de Hoja 1 + items de su categoría para la evaluación, o None si no tiene detalle."""
+    hechos = _hechos_vigentes()
+    if hechos is None:
+        return None
+    tabla = hechos["tabla"]
+    clave = (str(id_cliente), pd.Timestamp(fecha_hora))
+    if clave not in tabla.index:
+        return None
+    fila = tabla.loc[clave]
+    if not fila["CON DETALLE"]:
+        return None
+    return fila[hechos["base"] + hechos["items"].get(str(fila["CATEGORÍA DE EVALUACIÓN"]), [])]
+
+
+# --- BRECHAS POR ITEM ---
+COLUMNAS_BRECHAS = ['CATEGORÍA DE EVALUACIÓN', 'SUCURSAL', 'ITEM', 'TASA', 'EVALUACIONES']
+
+
+@st.cache_resource(max_entries=4)
+def _brechas(versiones, _tabla):
+    partes = []
+    for cat in EVALUATION_CATEGORIES:
+        df_c = _tabla[(_tabla['CATEGORÍA DE EVALUACIÓN'] == cat) & _tabla['CON DETALLE']]
+        if df_c.empty:
+            continue
+        # Una pasada por categoría: estados de todos los items de todas las evaluaciones
+        completos = puntuar(cat, matriz_puntajes(cat, df_c))["estados"] == OPTIMO
+        grupos = pd.DataFrame(completos, columns=ESCALAS[cat]["etiquetas"]).groupby(
+            df_c['SUCURSAL'].astype(str).to_numpy())
+        largo = (grupos.mean() * 100).rename_axis('SUCURSAL').melt(
+            ignore_index=False, var_name='ITEM', value_name='TASA').reset_index()
+        largo['EVALUACIONES'] = largo['SUCURSAL'].map(grupos.size())
+        largo.insert(0, 'CATEGORÍA DE EVALUACIÓN', cat)
+        partes.append(largo)
+    return pd.concat(partes, ignore_index=True) if partes else pd.DataFrame(columns=COLUMNAS_BRECHAS)
+
+
+def brechas_items():
+    """% de evaluaciones con cada item completo (Óptimo) por categoría y sucursal, en formato largo."""
+    versiones, principal, detalles = _datos_evaluacion()
+    if versiones is None:
+        return pd.DataFrame(columns=COLUMNAS_BRECHAS)
+    return _brechas(versiones, _hechos(versiones, principal, detalles)["tabla"])